@@ -8,7 +8,7 @@ Operates on the database.
 import os
 import sys
 import json
-import time
+import threading
 from pathlib import Path
 from google import genai
 from google.genai import types
@@ -25,7 +25,10 @@ if sys.platform == 'win32':
 load_dotenv()
 
 sys.path.append(str(Path(__file__).parent))
-from database import get_articles_by_status, update_article_status
+from database import claimed_articles, session, StatusBuffer
+import prefilter
+import llm_executor
+import gemini_client
 
 API_KEY = os.getenv("GOOGLE_API_KEY")
 if not API_KEY:
@@ -34,6 +37,58 @@ if not API_KEY:
 
 client = genai.Client(api_key=API_KEY)
 MODEL_ID = "gemini-3-pro-preview"
+# Only what the prompt needs; skips the JSON blobs
+ANALYZE_COLUMNS = ['title', 'source', 'summary']
+# Local keyword pre-filter decides clear cases without a Gemini call. Off until
+# its thresholds are tuned on production labels (prefilter.py --evaluate).
+USE_PREFILTER = os.getenv("RELEVANCE_PREFILTER", "0") == "1"
+
+CATEGORIES = ['Model Release', 'Chip Advancement', 'Industry Shift', 'Application', 'Research', 'Other']
+BATCH_SIZE = int(os.getenv("RELEVANCE_BATCH_SIZE", "10"))  # articles per Gemini call; 1 = one call each
+
+INSTRUCTIONS = f"""
+    Determine:
+    1. Relevance Score (0-10): How significant is this to the AI/LLM/Hardware industry?
+    2. Category: one of [{', '.join(CATEGORIES)}]
+    3. Infographic Worthy: true/false (Is there enough substance/impact for a visual?)
+    4. Reasoning: Brief explanation.
+"""
+
+# Gemini usage for this run, reported per article at the end
+usage = {'calls': 0, 'prompt_tokens': 0, 'output_tokens': 0}
+_usage_lock = threading.Lock()  # calls run on llm_executor worker threads
+
+def _record_usage(response):
+    if gemini_client.last_from_cache():
+        return  # replayed from the response cache, not billed
+    meta = getattr(response, 'usage_metadata', None)
+    with _usage_lock:
+        usage['calls'] += 1
+        if meta:
+            usage['prompt_tokens'] += meta.prompt_token_count or 0
+            usage['output_tokens'] += meta.candidates_token_count or 0
+
+def validate_analysis(item):
+    """Normalized analysis dict, or None if a required field is missing or malformed."""
+    if not isinstance(item, dict):
+        return None
+    score, worthy = item.get('relevance_score'), item.get('infographic_worthy')
+    if isinstance(score, str):
+        try:
+            score = float(score)
+        except ValueError:
+            return None
+    if isinstance(score, bool) or not isinstance(score, (int, float)) or not 0 <= score <= 10:
+        return None
+    if not isinstance(worthy, bool):
+        return None
+    category = item.get('category')
+    return {
+        "relevance_score": int(round(score)),
+        "category": category if category in CATEGORIES else 'Other',
+        "infographic_worthy": worthy,
+        "reasoning": str(item.get('reasoning') or ''),
+    }
 
 def analyze_article(article_data):
     """
@@ -45,13 +100,7 @@ def analyze_article(article_data):
     Title: {article_data.get('title')}
     Source: {article_data.get('source')}
     Summary: {article_data.get('summary')}
-    
-    Determine:
-    1. Relevance Score (0-10): How significant is this to the AI/LLM/Hardware industry?
-    2. Category: one of [Model Release, Chip Advancement, Industry Shift, Application, Research, Other]
-    3. Infographic Worthy: true/false (Is there enough substance/impact for a visual?)
-    4. Reasoning: Brief explanation.
-    
+    {INSTRUCTIONS}
     Return result in JSON format:
     {{
         "relevance_score": int,
@@ -62,53 +111,175 @@ def analyze_article(article_data):
     """
     
     try:
-        response = client.models.generate_content(
-            model=MODEL_ID, 
+        response = gemini_client.generate_content(
+            client,
+            model=MODEL_ID,
             contents=prompt,
             config=types.GenerateContentConfig(
                 response_mime_type="application/json"
-            )
+            ),
+            accept=gemini_client.json_where(validate_analysis)
         )
-        return json.loads(response.text)
+        _record_usage(response)
+        analysis = validate_analysis(json.loads(response.text))
+        if analysis is None:
+            raise ValueError(f"Malformed analysis: {response.text[:200]}")
+        return analysis
     except Exception as e:
         print(f"Error analyzing {article_data.get('id')}: {e}")
-        return None
+        raise
 
-def main():
-    print(f"Starting Relevance Analysis using {MODEL_ID}...")
-    
-    # Fetch pending articles
-    pending = get_articles_by_status('ingested', limit=50)
-    print(f"Found {len(pending)} articles to analyze.")
+def analyze_batch(articles):
+    """
+    Score several articles in one Gemini call. Returns {article_id: analysis}
+    holding only items whose result came back well-formed; the caller falls
+    back to single calls for the rest.
+    """
+    items = json.dumps([{
+        "id": article['id'],
+        "title": article.get('title'),
+        "source": article.get('source'),
+        "summary": article.get('summary'),
+    } for article in articles], ensure_ascii=False, indent=1)
+    wanted = {article['id'] for article in articles}
+    prompt = f"""
+    Analyze each of the following news items for use in an "AI Industry Infographic Feed".
+    Judge every item independently.
+
+    Items:
+    {items}
+
+    For each item:{INSTRUCTIONS}
+    Return a JSON array with exactly one object per item, copying its "id":
+    [
+        {{
+            "id": "string",
+            "relevance_score": int,
+            "category": "string",
+            "infographic_worthy": boolean,
+            "reasoning": "string"
+        }}
+    ]
+    """
+
+    try:
+        response = gemini_client.generate_content(
+            client,
+            model=MODEL_ID,
+            contents=prompt,
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json"
+            ),
+            # Cache only complete answers; a partial one is asked again next run
+            accept=gemini_client.json_where(lambda results: len(parse_batch(results, wanted)) == len(wanted))
+        )
+        _record_usage(response)
+        return parse_batch(json.loads(response.text), wanted)
+    except Exception as e:
+        print(f"Error analyzing batch of {len(articles)}: {e}")
+        return {}
+
+def parse_batch(results, wanted):
+    """{article_id: analysis} for the well-formed items of a batch answer whose id is in `wanted`."""
+    analyses = {}
+    for item in results if isinstance(results, list) else []:
+        analysis = validate_analysis(item)
+        if analysis and item.get('id') in wanted:
+            analyses[item['id']] = analysis
+    return analyses
+
+def analyze_articles(articles, batch_size=BATCH_SIZE):
+    """
+    ({article_id: analysis}, {article_id: error}) for all articles:
+    batch_size per call, then one call each for items missing or malformed
+    in a batch response. Calls run concurrently under the model's rate
+    limits (llm_executor).
+    """
+    results, errors = {}, {}
+    if batch_size > 1:
+        chunks = [articles[i:i + batch_size] for i in range(0, len(articles), batch_size)]
+        print(f"Analyzing {len(articles)} articles in {len(chunks)} batches...")
+        for chunk, analyses, _ in llm_executor.run(analyze_batch, chunks):
+            results.update(analyses or {})
+
+    missing = [article for article in articles if article['id'] not in results]
+    if batch_size > 1 and missing:
+        print(f"  Retrying {len(missing)} singly...")
+    for article, analysis, error in llm_executor.run(analyze_article, missing):
+        if analysis:
+            results[article['id']] = analysis
+        else:
+            errors[article['id']] = error
+    return results, errors
+
+def main(batch_size=BATCH_SIZE):
+    mode = f"batches of {batch_size}" if batch_size > 1 else "one call per article"
+    print(f"Starting Relevance Analysis using {MODEL_ID} ({mode})...")
     
     processed_count = 0
     relevant_count = 0
+    prefiltered_count = 0
     
-    for article in pending:
-        print(f"Analyzing: {article.get('title', 'Unknown')[:50]}...")
-        analysis = analyze_article(article)
+    # Lease pending articles so overlapping runs never analyze the same row
+    with claimed_articles('ingested', limit=50, columns=ANALYZE_COLUMNS) as pending, StatusBuffer() as updates:
+        print(f"Found {len(pending)} articles to analyze.")
         
-        if analysis:
-            score = analysis.get('relevance_score', 0)
-            is_worthy = analysis.get('infographic_worthy', False)
+        to_llm = []
+        for article in pending:
+            if USE_PREFILTER:
+                status, analysis = prefilter.classify(article)
+                if status:
+                    updates.add(article['id'], status, {'analysis': analysis})
+                    prefiltered_count += 1
+                    relevant_count += status == 'filtered'
+                    print(f"Prefilter: {article.get('title', 'Unknown')[:50]}... -> {status.upper()} "
+                          f"(score {analysis['prefilter_score']})")
+                    continue
+            to_llm.append(article)
+
+        results, errors = analyze_articles(to_llm, batch_size)
+        for article in to_llm:
+            print(f"Analyzed: {article.get('title', 'Unknown')[:50]}...")
+            analysis = results.get(article['id'])
+        
+            if analysis:
+                score = analysis.get('relevance_score', 0)
+                is_worthy = analysis.get('infographic_worthy', False)
             
-            # Save if relevant: score >= 3 OR explicitly marked as infographic_worthy
-            is_relevant = (score >= 3 or is_worthy)
+                # Save if relevant: score >= 3 OR explicitly marked as infographic_worthy
+                is_relevant = (score >= 3 or is_worthy)
             
-            if is_relevant:
-                update_article_status(article['id'], 'filtered', {'analysis': analysis})
-                relevant_count += 1
-                print(f"  -> RELEVANT (Score: {score}, Worthy: {is_worthy})")
-            else:
-                update_article_status(article['id'], 'ignored', {'analysis': analysis})
-                print(f"  -> IGNORED (Score: {score})")
+                if is_relevant:
+                    updates.add(article['id'], 'filtered', {'analysis': analysis})
+                    relevant_count += 1
+                    print(f"  -> RELEVANT (Score: {score}, Worthy: {is_worthy})")
+                else:
+                    updates.add(article['id'], 'ignored', {'analysis': analysis})
+                    print(f"  -> IGNORED (Score: {score})")
                 
-            processed_count += 1
-            time.sleep(1) # Rate limit politeness
-        else:
-            print(f"  -> Failed to analyze.")
+                processed_count += 1
+            else:
+                print(f"  -> Failed to analyze.")
+                # Counts toward the article's attempts; dead-lettered after MAX_ATTEMPTS
+                error = errors.get(article['id'])
+                if gemini_client.counts_as_attempt(error):
+                    updates.fail(article['id'], error or 'No analysis returned')
         
-    print(f"Analysis complete. Analyzed {processed_count}, Found {relevant_count} relevant items.")
+    print(f"Analysis complete. Analyzed {processed_count} with Gemini, {prefiltered_count} by prefilter. "
+          f"Found {relevant_count} relevant items.")
+    if to_llm:
+        tokens = usage['prompt_tokens'] + usage['output_tokens']
+        print(f"Gemini usage: {usage['calls']} calls, {tokens} tokens for {len(to_llm)} articles "
+              f"({usage['calls'] / len(to_llm):.2f} calls, {tokens / len(to_llm):.0f} tokens per article; "
+              f"{usage['prompt_tokens']} in / {usage['output_tokens']} out)")
+        gemini_client.print_metrics()
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="Score ingested articles for relevance")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE,
+                        help="Articles per Gemini call (1 = one call per article)")
+    args = parser.parse_args()
+
+    with session():
+        main(args.batch_size)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Lens Database Benchmark
+Measures connects, replica syncs and wall time for a typical stage workload.
+
+Turso is simulated: the embedded replica is a temp SQLite file and every
+conn.sync() sleeps for --sync-ms to stand in for the network round-trip.
+Each mode is run with the given TURSO_SYNC_POLICY.
+
+    python execution/bench_database.py --rows 200 --sync-ms 40
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+from pathlib import Path
+from uuid import uuid4
+
+sys.path.append(str(Path(__file__).parent))
+import database
+
+
+class SimulatedReplica:
+    """sqlite3 connection with a libsql-style sync() that costs a fixed latency."""
+
+    def __init__(self, path, sync_seconds):
+        self._conn = sqlite3.connect(path)
+        self._sync_seconds = sync_seconds
+
+    def sync(self):
+        time.sleep(self._sync_seconds)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class SimulatedLibsql:
+    """Drop-in for the libsql module used by database.get_connection()."""
+
+    def __init__(self, sync_seconds):
+        self.sync_seconds = sync_seconds
+
+    def connect(self, path, sync_url=None, auth_token=None):
+        return SimulatedReplica(path, self.sync_seconds)
+
+
+def make_articles(n):
+    return [{
+        "id": str(uuid4()),
+        "title": f"Benchmark article {i}",
+        "link": f"https://example.com/bench/{uuid4()}",
+        "source": "Benchmark",
+        "summary": "Lorem ipsum " * 40,
+        "published": "2026-01-01T00:00:00",
+    } for i in range(n)]
+
+
+def workload(articles, bulk):
+    """One ingest stage followed by one processing stage, like a cycle."""
+    database.init_db()
+    if bulk:
+        database.insert_articles_bulk(articles)
+    else:
+        for article in articles:
+            database.insert_article(article)
+    pending = database.get_articles_by_status('ingested', limit=len(articles))
+    if bulk:
+        with database.StatusBuffer() as updates:
+            for article in pending:
+                updates.add(article['id'], 'filtered', {'analysis': {'relevance_score': 5}})
+    else:
+        for article in pending:
+            database.update_article_status(article['id'], 'filtered', {'analysis': {'relevance_score': 5}})
+    database.get_stats()
+
+
+def run(label, articles, use_session, bulk, policy):
+    database.SYNC_POLICY = policy
+    database.reset_db_stats()
+    start = time.perf_counter()
+    if use_session:
+        with database.session():
+            workload(articles, bulk)
+    else:
+        workload(articles, bulk)
+    elapsed = time.perf_counter() - start
+    stats = database.get_db_stats()
+    return label, stats['connects'], stats['syncs'], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark database connect/sync overhead")
+    parser.add_argument("--rows", type=int, default=200, help="Articles to insert and update")
+    parser.add_argument("--sync-ms", type=float, default=40.0, help="Simulated replica sync latency")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="llmlens_bench_")
+    database.TURSO_URL = "libsql://bench.invalid"
+    database.TURSO_TOKEN = "bench"
+    database.libsql = SimulatedLibsql(args.sync_ms / 1000.0)
+
+    results = []
+    modes = [
+        ("per-call connections", False, False, "per-write"),
+        ("shared session", True, False, "per-write"),
+        ("session + bulk writes", True, True, "per-write"),
+        ("bulk + coalesce", True, True, "coalesce"),
+        ("bulk + per-stage", True, True, "per-stage"),
+    ]
+    for label, use_session, bulk, policy in modes:
+        database.REPLICA_PATH = os.path.join(workdir, f"{uuid4().hex}.db")
+        results.append(run(label, make_articles(args.rows), use_session, bulk, policy))
+
+    print(f"Workload: {args.rows} inserts + {args.rows} status updates, sync latency {args.sync_ms:.0f}ms")
+    print(f"{'mode':<24}{'connects':>10}{'syncs':>10}{'wall (s)':>12}")
+    for label, connects, syncs, elapsed in results:
+        print(f"{label:<24}{connects:>10}{syncs:>10}{elapsed:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
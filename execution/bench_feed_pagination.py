@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Lens Feed Pagination Benchmark
+Compares LIMIT/OFFSET paging with keyset (cursor) paging on a synthetic
+archive in a temporary local SQLite database.
+
+    python execution/bench_feed_pagination.py --rows 100000 --pages 1,100,1000
+"""
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+import database
+
+
+def populate(rows):
+    """Fill the archive: two thirds feed-visible, one third ignored."""
+    statuses = list(database.FEED_STATUSES) + ['ignored'] * 3
+    sources = ['TechCrunch AI', 'The Verge - AI', 'r/LocalLLaMA', 'ArXiv CS.AI']
+    now = int(time.time())
+    articles = [{
+        "id": f"{i:08d}",
+        "title": f"Archive article {i}",
+        "link": f"https://example.com/archive/{i}",
+        "source": random.choice(sources),
+        "summary": "Lorem ipsum " * 20,
+        "published_ts": now - random.randint(0, 3 * 365 * 86400),
+    } for i in range(rows)]
+    database.insert_articles_bulk(articles)
+
+    with database.session() as conn:
+        cursor = conn.cursor()
+        cursor.executemany('UPDATE articles SET status = ? WHERE id = ?',
+                           [(random.choice(statuses), a['id']) for a in articles])
+        conn.commit()
+    # Refresh planner statistics for the populated table
+    database.init_db()
+
+
+def offset_page(page, limit):
+    with database.session() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT * FROM articles WHERE status IN ({database.FEED_STATUS_SQL})
+            ORDER BY published_ts DESC, id DESC LIMIT ? OFFSET ?
+        ''', (limit, (page - 1) * limit))
+        return [database.row_to_dict(cursor, row) for row in cursor.fetchall()]
+
+
+def timed(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OFFSET vs keyset feed pagination")
+    parser.add_argument("--rows", type=int, default=100000, help="Archive size")
+    parser.add_argument("--pages", default="1,100,1000", help="Comma-separated page numbers to measure")
+    parser.add_argument("--limit", type=int, default=30, help="Page size")
+    parser.add_argument("--repeats", type=int, default=20, help="Timed repetitions (median reported)")
+    args = parser.parse_args()
+
+    random.seed(42)
+    database.TURSO_URL = None
+    database.DB_PATH = str(Path(tempfile.mkdtemp(prefix="llmlens_bench_")) / "feed.db")
+    database.init_db()
+    print(f"Populating {args.rows} articles...")
+    populate(args.rows)
+
+    pages = sorted(int(p) for p in args.pages.split(','))
+    print(f"{'page':>6}{'OFFSET (ms)':>14}{'keyset (ms)':>14}")
+    with database.session():
+        # Walk the feed once, keeping the cursor that starts each measured page
+        cursors = {}
+        cursor = None
+        for page in range(1, pages[-1] + 1):
+            if page in pages:
+                cursors[page] = cursor
+            _, cursor = database.get_feed_page(cursor, args.limit)
+            if cursor is None:
+                break
+
+        for page, page_cursor in cursors.items():
+            keyset_rows, _ = database.get_feed_page(page_cursor, args.limit)
+            offset_rows = offset_page(page, args.limit)
+            assert [r['id'] for r in keyset_rows] == [r['id'] for r in offset_rows], "pagers disagree"
+
+            offset_ms = timed(lambda: offset_page(page, args.limit), args.repeats)
+            keyset_ms = timed(lambda: database.get_feed_page(page_cursor, args.limit), args.repeats)
+            print(f"{page:>6}{offset_ms:>14.2f}{keyset_ms:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
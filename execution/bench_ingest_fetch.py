@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Lens Ingest Fetch Benchmark
+Times the old sequential fetch loop (with its fixed sleeps) against the
+concurrent per-host-throttled fetcher. Sources are served by a local HTTP
+server that stands in for each host and adds --latency-ms per response.
+
+    python execution/bench_ingest_fetch.py --latency-ms 400
+"""
+import sys
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.append(str(Path(__file__).parent))
+import http_client
+import ingest_news
+
+RSS_TEMPLATE = '''<?xml version="1.0"?>
+<rss version="2.0"><channel><title>{name}</title>{items}</channel></rss>'''
+ITEM_TEMPLATE = '''<item><title>{name} story {i}</title><link>https://example.com/{name}/{i}</link>
+<description>Summary {i}</description><pubDate>{date}</pubDate></item>'''
+
+
+def make_handler(latency):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            now = datetime.now()
+            if self.path.endswith('.json'):
+                body = json.dumps({'data': {'children': [{'data': {
+                    'title': f"Post {i}", 'permalink': f"{self.path}/{i}",
+                    'created_utc': now.timestamp(), 'selftext': 'text', 'score': 1, 'num_comments': 0,
+                }} for i in range(25)]}}).encode()
+                content_type = 'application/json'
+            else:
+                date = now.strftime('%a, %d %b %Y %H:%M:%S +0000')
+                items = ''.join(ITEM_TEMPLATE.format(name=self.path.strip('/'), i=i, date=date) for i in range(20))
+                body = RSS_TEMPLATE.format(name=self.path, items=items).encode()
+                content_type = 'application/rss+xml'
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+    return Handler
+
+
+def start_server(latency):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def sequential(feeds, subs):
+    """The pre-concurrency loop: one source at a time, fixed sleeps between."""
+    for config in feeds:
+        ingest_news.fetch_feed(config)
+        time.sleep(1)
+    for config in subs:
+        ingest_news.fetch_reddit(config)
+        time.sleep(2)
+
+
+def concurrent(feeds, subs):
+    for _ in ingest_news.fetch_sources(feeds, subs):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sequential vs concurrent ingest fetching")
+    parser.add_argument("--latency-ms", type=float, default=400.0, help="Injected per-response latency")
+    args = parser.parse_args()
+
+    # One local server per real host, so per-host throttling applies as in production
+    feed_server = start_server(args.latency_ms / 1000.0)
+    arxiv_server = start_server(args.latency_ms / 1000.0)
+    reddit_server = start_server(args.latency_ms / 1000.0)
+    feed_host = f"127.0.0.1:{feed_server.server_port}"
+    arxiv_host = f"127.0.0.1:{arxiv_server.server_port}"
+    reddit_host = f"127.0.0.1:{reddit_server.server_port}"
+
+    # Mirror production: distinct hosts per publisher, shared arxiv/reddit throttles
+    http_client.throttle = http_client.HostThrottle({
+        arxiv_host: http_client.HOST_INTERVALS['arxiv.org'],
+        reddit_host: http_client.HOST_INTERVALS['reddit.com'],
+    })
+    feeds = [
+        {**config, 'url': f"http://{arxiv_host if 'arxiv' in config['url'] else feed_host}/{i}"}
+        for i, config in enumerate(ingest_news.RSS_FEEDS)
+    ]
+    ingest_news.REDDIT_URL = f"http://{reddit_host}/r/{{sub}}/{{filter}}.json"
+    subs = ingest_news.REDDIT_SUBS
+
+    results = []
+    for label, fn in [("sequential + sleeps", sequential), ("concurrent", concurrent)]:
+        start = time.perf_counter()
+        fn(feeds, subs)
+        results.append((label, time.perf_counter() - start))
+
+    print(f"\n{len(feeds)} feeds + {len(subs)} subreddits, latency {args.latency_ms:.0f}ms")
+    print(f"{'mode':<22}{'wall (s)':>10}")
+    for label, elapsed in results:
+        print(f"{label:<22}{elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
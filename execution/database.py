@@ -7,8 +7,15 @@ Provides SQLite/Turso connectivity for accelerated news processing.
 import os
 import sys
 import json
+import base64
+import atexit
+import socket
+import time
 import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+from email.utils import parsedate_to_datetime
 import libsql
 from dotenv import load_dotenv
 
@@ -24,14 +31,124 @@ if sys.platform == 'win32':
 DB_PATH = os.path.join(os.getcwd(), 'llm_lens.db')
 TURSO_URL = os.getenv("TURSO_DATABASE_URL")
 TURSO_TOKEN = os.getenv("TURSO_AUTH_TOKEN")
+REPLICA_PATH = "turso_cache.db"
+
+# Replica sync policy (Turso mode only):
+#   per-write  - sync after every committed write (default)
+#   per-stage  - sync once when the session()/connection closes
+#   coalesce   - sync after TURSO_SYNC_EVERY_WRITES writes or TURSO_SYNC_INTERVAL seconds
+SYNC_POLICIES = ('per-write', 'per-stage', 'coalesce')
+SYNC_POLICY = os.getenv("TURSO_SYNC_POLICY", "per-write")
+SYNC_EVERY_WRITES = int(os.getenv("TURSO_SYNC_EVERY_WRITES", "50"))
+SYNC_INTERVAL = float(os.getenv("TURSO_SYNC_INTERVAL", "30"))
+# Reads accept a replica synced within this many seconds (unset: sync on every connect)
+_max_staleness = os.getenv("TURSO_READ_MAX_STALENESS")
+READ_MAX_STALENESS = float(_max_staleness) if _max_staleness else None
+
+if SYNC_POLICY not in SYNC_POLICIES:
+    print(f"Unknown TURSO_SYNC_POLICY '{SYNC_POLICY}', using per-write")
+    SYNC_POLICY = 'per-write'
+
+# Identifies this process when leasing work (see claim_articles)
+WORKER_ID = os.getenv("WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+
+# Appends this process's counters as one JSON line at exit (used by marathon_loop)
+DB_STATS_PATH = os.getenv("DB_STATS_PATH")
+
+# Connection/sync counters for the current process (see get_db_stats)
+_stats = {'connects': 0, 'syncs': 0, 'sync_seconds': 0.0, 'replica_growth_bytes': 0}
+_sync_state = {'last_sync': None, 'pending_writes': 0}
+
+# Per-thread shared connection opened by session()
+_local = threading.local()
+
+def _replica_bytes():
+    """Size of the embedded replica on disk, including its WAL."""
+    total = 0
+    for path in (REPLICA_PATH, REPLICA_PATH + '-wal'):
+        if os.path.exists(path):
+            total += os.path.getsize(path)
+    return total
+
+def _replica_age():
+    """Seconds since the replica was last synced by any process (inf if never)."""
+    last = _sync_state['last_sync']
+    marker = REPLICA_PATH + '.synced'
+    if os.path.exists(marker):
+        last = max(last or 0, os.path.getmtime(marker))
+    return time.time() - last if last else float('inf')
+
+def _sync(conn):
+    """
+    Sync an embedded Turso replica, counting calls, time and how much the
+    replica file (plus WAL) grew. Growth is not traffic: frames that rewrite
+    existing pages add nothing and a checkpoint can shrink the WAL, so it
+    only bounds how much new data landed locally.
+    """
+    if not hasattr(conn, 'sync'):
+        return
+    size_before = _replica_bytes()
+    start = time.perf_counter()
+    conn.sync()
+    _stats['syncs'] += 1
+    _stats['sync_seconds'] += time.perf_counter() - start
+    _stats['replica_growth_bytes'] += max(0, _replica_bytes() - size_before)
+    _sync_state['last_sync'] = time.time()
+    _sync_state['pending_writes'] = 0
+    try:
+        with open(REPLICA_PATH + '.synced', 'w'):
+            pass
+    except OSError:
+        pass
+
+def _after_write(conn):
+    """Apply SYNC_POLICY after a committed write transaction."""
+    if not hasattr(conn, 'sync'):
+        return
+    _sync_state['pending_writes'] += 1
+    if SYNC_POLICY == 'per-stage':
+        return
+    if SYNC_POLICY == 'coalesce':
+        since_sync = time.time() - (_sync_state['last_sync'] or 0)
+        if _sync_state['pending_writes'] < SYNC_EVERY_WRITES and since_sync < SYNC_INTERVAL:
+            return
+    _sync(conn)
+
+def _before_read(conn):
+    """Re-sync before a read only if the replica is older than READ_MAX_STALENESS."""
+    if READ_MAX_STALENESS is not None and _replica_age() > READ_MAX_STALENESS:
+        _sync(conn)
+
+def _flush(conn):
+    """Sync any writes still deferred by the sync policy."""
+    if _sync_state['pending_writes']:
+        _sync(conn)
+
+def get_db_stats():
+    """Return a copy of the connect/sync counters for this process."""
+    return dict(_stats)
+
+def reset_db_stats():
+    """Zero the connect/sync counters."""
+    _stats.update(connects=0, syncs=0, sync_seconds=0.0, replica_growth_bytes=0)
+
+def _write_db_stats():
+    if DB_STATS_PATH and _stats['connects']:
+        record = {'script': os.path.basename(sys.argv[0]), **get_db_stats()}
+        with open(DB_STATS_PATH, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+atexit.register(_write_db_stats)
 
 def get_connection():
     """Get a database connection (Local SQLite or Turso Cloud)."""
+    _stats['connects'] += 1
     if TURSO_URL and TURSO_TOKEN:
         try:
-            # Connect to local file with sync to remote
-            conn = libsql.connect("turso_cache.db", sync_url=TURSO_URL, auth_token=TURSO_TOKEN)
-            conn.sync()
+            # Connect to local file with sync to remote, unless the replica is fresh enough
+            conn = libsql.connect(REPLICA_PATH, sync_url=TURSO_URL, auth_token=TURSO_TOKEN)
+            if READ_MAX_STALENESS is None or _replica_age() > READ_MAX_STALENESS:
+                _sync(conn)
             # Turso connection doesn't support row_factory = sqlite3.Row
             return conn
         except Exception as e:
@@ -42,6 +159,51 @@ def get_connection():
     conn.row_factory = sqlite3.Row
     return conn
 
+@contextmanager
+def session():
+    """
+    Share one connection across all helpers for the duration of a stage run.
+
+        with database.session():
+            for article in database.get_articles_by_status('filtered'):
+                database.update_article_status(...)
+
+    Nested sessions reuse the outer connection. Writes deferred by the
+    sync policy are synced when the outermost session closes.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        yield conn
+        return
+
+    conn = get_connection()
+    _local.conn = conn
+    try:
+        yield conn
+    finally:
+        _local.conn = None
+        try:
+            _flush(conn)
+        finally:
+            conn.close()
+
+@contextmanager
+def _connection():
+    """Yield the session connection if one is open, else a short-lived one."""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        yield conn
+        return
+
+    conn = get_connection()
+    try:
+        yield conn
+    finally:
+        try:
+            _flush(conn)
+        finally:
+            conn.close()
+
 def row_to_dict(cursor, row):
     """Helper to convert a row to a dictionary if it isn't one already."""
     if isinstance(row, dict):
@@ -54,89 +216,613 @@ def row_to_dict(cursor, row):
         d[col[0]] = row[idx]
     return d
 
+# Pipeline state machine: status -> statuses it may move to.
+# Each stage claims rows in exactly one status, so "pending work" is the
+# indexed predicate status = ? and never scans already-processed history.
+TRANSITIONS = {
+    'ingested': ('filtered', 'ignored', 'failed'),   # analyze_relevance
+    'filtered': ('distilled', 'ignored', 'failed'),  # distill_facts
+    'distilled': ('verified', 'failed'),             # verify_facts
+    'verified': ('visualized', 'failed'),            # generate_ai_visuals
+    'visualized': ('uploaded', 'failed'),            # upload_visuals (same run: the PNG is local; kept local without Cloudinary)
+    'uploaded': ('critiqued', 'failed'),             # self_critique
+    'critiqued': (),
+    'ignored': (),
+    'duplicate': (),  # set at ingest; story_id points at the canonical article
+    'capped': (),     # set at ingest; over the source's per-cycle yield cap
+    'failed': (),     # MAX_ATTEMPTS failures in failed_from; dead_letter.py requeues
+}
+# Statuses whose articles have facts and can be shown in the feed
+FEED_STATUSES = ('distilled', 'verified', 'visualized', 'critiqued', 'uploaded')
+# Inlined as literals: SQLite only uses the partial feed index when the
+# query's WHERE matches it textually, which bound parameters can't do.
+FEED_STATUS_SQL = ', '.join(f"'{status}'" for status in FEED_STATUSES)
+# Outcome groups for per-source yield (refresh_source_yield)
+PASSED_STATUSES = ('filtered',) + FEED_STATUSES
+VISUALIZED_STATUSES = ('visualized', 'critiqued', 'uploaded')
+
+# Poison items: a row whose stage keeps failing is retried after
+# RETRY_BASE_SECONDS * 2**(attempts - 1), capped at RETRY_MAX_SECONDS,
+# and dead-lettered as 'failed' after MAX_ATTEMPTS failures.
+MAX_ATTEMPTS = int(os.getenv("PIPELINE_MAX_ATTEMPTS", "5"))
+RETRY_BASE_SECONDS = float(os.getenv("PIPELINE_RETRY_BASE_SECONDS", "3600"))
+RETRY_MAX_SECONDS = 24 * 3600
+
+def _allowed_from(new_status):
+    """Statuses an article must be in to move to new_status."""
+    sources = tuple(status for status, targets in TRANSITIONS.items() if new_status in targets)
+    if not sources:
+        raise ValueError(f"Unknown target status: {new_status}")
+    return sources
+
+# Columns added after the original schema; init_db() adds any an older database lacks
+ADDED_COLUMNS = {
+    'claimed_by': 'TEXT',
+    'lease_expires_at': 'REAL',
+    'published_ts': 'INTEGER',
+    'canonical_url': 'TEXT',
+    'simhash': 'INTEGER',
+    'story_id': 'TEXT',
+    'attempts': 'INTEGER DEFAULT 0',  # failures in the current status
+    'last_error': 'TEXT',
+    'next_eligible_at': 'REAL',       # claim_articles skips the row until then
+    'failed_from': 'TEXT',            # status the row was dead-lettered from
+}
+
+# Per-source fetch state (conditional GET validators), keyed by source name
+SOURCE_STATE_COLUMNS = {
+    'url': 'TEXT',
+    'etag': 'TEXT',
+    'last_modified': 'TEXT',
+    'content_hash': 'TEXT',
+    'watermark_ts': 'INTEGER',   # newest published_ts ingested from the source
+    'seen_guids': 'TEXT',        # JSON list of GUIDs in the last fetched listing
+    'last_polled_at': 'REAL',    # adaptive polling schedule (ingest_news.schedule_next_poll)
+    'poll_interval': 'REAL',
+    'next_poll_at': 'REAL',
+    'publish_rate': 'REAL',      # smoothed new entries per hour
+    'yield_decided': 'INTEGER',  # rolling-window relevance outcomes (refresh_source_yield)
+    'yield_passed': 'INTEGER',
+    'yield_visualized': 'INTEGER',
+    'yield_ignored': 'INTEGER',
+}
+
+def _add_missing_columns(cursor, table='articles', columns=ADDED_COLUMNS):
+    """Add columns an older database's table lacks. Returns the names added."""
+    cursor.execute(f'PRAGMA table_info({table})')
+    existing = {row[1] for row in cursor.fetchall()}
+    added = []
+    for name, col_type in columns.items():
+        if name not in existing:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {col_type}')
+            added.append(name)
+    return added
+
+def _migrate_statuses(cursor):
+    """
+    Move rows processed before the explicit verified/uploaded/critiqued states
+    existed into the state their stored results imply. Idempotent.
+    """
+    cursor.execute('''
+        UPDATE articles SET status = 'verified'
+        WHERE status = 'distilled' AND analysis_json LIKE '%"verification"%'
+    ''')
+    cursor.execute('''
+        UPDATE articles SET status = 'uploaded'
+        WHERE status = 'visualized' AND image_path IS NOT NULL AND image_path NOT LIKE '/feed/%'
+    ''')
+    cursor.execute('''
+        UPDATE articles SET status = 'critiqued'
+        WHERE status = 'uploaded' AND critique_json IS NOT NULL
+    ''')
+
+def _refresh_planner_stats(cursor):
+    """
+    Keep sqlite_stat1 current. Without statistics the planner reads the
+    feed via the status index and sorts every match instead of walking
+    idx_feed_published and stopping at LIMIT.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+    if cursor.fetchone():
+        cursor.execute('PRAGMA optimize')
+    else:
+        cursor.execute('ANALYZE')
+
+ARTICLE_COLUMNS = (
+    'id', 'title', 'url', 'source', 'summary', 'published', 'fetched_at', 'status',
+    'headline', 'analysis_json', 'facts_json', 'image_path', 'critique_json',
+    'created_at', 'updated_at', 'claimed_by', 'lease_expires_at', 'published_ts',
+    'canonical_url', 'simhash', 'story_id', 'attempts', 'last_error', 'next_eligible_at',
+    'failed_from',
+)
+# JSON text columns and the ArticleRecord attribute that decodes each one
+JSON_COLUMNS = {'analysis': 'analysis_json', 'facts': 'facts_json', 'critique': 'critique_json'}
+
+class ArticleRecord:
+    """
+    Compact tuple-backed article row. Reads like the dicts from row_to_dict
+    (record['title'], record.get('summary')), and exposes the JSON columns
+    decoded as record.analysis / .facts / .critique, parsed on first access.
+    """
+    __slots__ = ('_index', '_values', '_decoded')
+
+    def __init__(self, index, values):
+        self._index = index  # column -> position, shared by every row of a query
+        self._values = values
+        self._decoded = None
+
+    def __getitem__(self, key):
+        return self._values[self._index[key]]
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def get(self, key, default=None):
+        position = self._index.get(key)
+        return default if position is None else self._values[position]
+
+    def keys(self):
+        return self._index.keys()
+
+    def __getattr__(self, name):
+        column = JSON_COLUMNS.get(name)
+        if column is None:
+            raise AttributeError(name)
+        if self._decoded is None:
+            self._decoded = {}
+        if name not in self._decoded:
+            raw = self.get(column)
+            self._decoded[name] = json.loads(raw) if isinstance(raw, str) and raw else raw
+        return self._decoded[name]
+
+    def __repr__(self):
+        return f"ArticleRecord(id={self.get('id')!r}, title={self.get('title')!r})"
+
+def _projection(columns):
+    """SQL select list for a column projection; id is always included."""
+    if not columns:
+        return '*'
+    unknown = set(columns) - set(ARTICLE_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown article columns: {sorted(unknown)}")
+    return ', '.join(['id'] + [c for c in columns if c != 'id'])
+
+def _iter_records(cursor, batch_size=100):
+    """Yield ArticleRecords from an executed cursor, fetchmany() at a time."""
+    index = {col[0]: i for i, col in enumerate(cursor.description)}
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        for row in rows:
+            yield ArticleRecord(index, tuple(row))
+
 def init_db():
     """Initialize the database schema."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Articles table (SQLite standard)
-    create_table_sql = '''
-        CREATE TABLE IF NOT EXISTS articles (
-            id TEXT PRIMARY KEY,
-            title TEXT NOT NULL,
-            url TEXT UNIQUE,
-            source TEXT,
-            summary TEXT,
-            published TEXT,
-            fetched_at TEXT,
-            status TEXT DEFAULT 'ingested',
-            headline TEXT,
-            analysis_json TEXT,
-            facts_json TEXT,
-            image_path TEXT,
-            critique_json TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    '''
-    
-    cursor.execute(create_table_sql)
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_status ON articles(status)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_source ON articles(source)')
-    
-    conn.commit()
-    if hasattr(conn, 'sync'): conn.sync()
-    conn.close()
+    with _connection() as conn:
+        cursor = conn.cursor()
+        
+        # Articles table (SQLite standard)
+        create_table_sql = '''
+            CREATE TABLE IF NOT EXISTS articles (
+                id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                url TEXT UNIQUE,
+                source TEXT,
+                summary TEXT,
+                published TEXT,
+                fetched_at TEXT,
+                status TEXT DEFAULT 'ingested',
+                headline TEXT,
+                analysis_json TEXT,
+                facts_json TEXT,
+                image_path TEXT,
+                critique_json TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                claimed_by TEXT,
+                lease_expires_at REAL,
+                published_ts INTEGER,
+                canonical_url TEXT,
+                simhash INTEGER,
+                story_id TEXT,
+                attempts INTEGER DEFAULT 0,
+                last_error TEXT,
+                next_eligible_at REAL,
+                failed_from TEXT
+            )
+        '''
+        
+        cursor.execute(create_table_sql)
+        added = _add_missing_columns(cursor)
+        state_columns = ''.join(f', {name} {col_type}' for name, col_type in SOURCE_STATE_COLUMNS.items())
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS source_state (
+                source TEXT PRIMARY KEY{state_columns},
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        _add_missing_columns(cursor, 'source_state', SOURCE_STATE_COLUMNS)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_status ON articles(status)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_source ON articles(source)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_status_lease ON articles(status, lease_expires_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_status_created ON articles(status, created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_status_published ON articles(status, published_ts)')
+        # Covers get_known_urls without touching the table; get_story_fingerprints
+        # ranges over it and reads only the recent rows' titles
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_recent_stories
+            ON articles(published_ts, url, canonical_url, simhash, story_id, status)
+        ''')
+        # Feed reads walk this in order and stop after LIMIT rows
+        cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS idx_feed_published ON articles(published_ts DESC, id DESC)
+            WHERE status IN ({FEED_STATUS_SQL})
+        ''')
+        _migrate_statuses(cursor)
+        _refresh_planner_stats(cursor)
+        
+        conn.commit()
+        _after_write(conn)
+    if 'published_ts' in added:
+        backfill_published_ts()
     mode = "Turso Cloud" if (TURSO_URL and TURSO_TOKEN) else "Local SQLite"
     print(f"Database initialized. Mode: {mode}")
 
+def parse_published(value):
+    """
+    Parse a feed date (RFC-822 from RSS, ISO-8601 from Reddit/ArXiv) into UTC
+    epoch seconds. Naive values are taken as local time, matching how
+    ingest_news formats them. Returns None if unparseable.
+    """
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    value = str(value).strip()
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        dt = None
+    if dt is None:
+        try:
+            dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            try:
+                from dateutil import parser
+                dt = parser.parse(value)
+            except (ValueError, OverflowError):
+                return None
+    return int(dt.timestamp())
+
+def _published_ts(article_data):
+    """published_ts for a record: explicit, parsed from published, else fetch time."""
+    if article_data.get('published_ts') is not None:
+        return article_data['published_ts']
+    return (parse_published(article_data.get('published'))
+            or parse_published(article_data.get('fetched_at'))
+            or int(time.time()))
+
+def backfill_published_ts(chunk_size=500):
+    """
+    Fill published_ts for rows stored before the column existed, one
+    chunk per transaction so a large table never holds a long write lock.
+    Returns the number of rows updated.
+    """
+    total = 0
+    with _connection() as conn:
+        cursor = conn.cursor()
+        while True:
+            cursor.execute(
+                'SELECT id, published, fetched_at FROM articles WHERE published_ts IS NULL LIMIT ?',
+                (chunk_size,)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            cursor.executemany('UPDATE articles SET published_ts = ? WHERE id = ?', [
+                (_published_ts({'published': row[1], 'fetched_at': row[2]}), row[0])
+                for row in rows
+            ])
+            conn.commit()
+            _after_write(conn)
+            total += len(rows)
+    print(f"Backfilled published_ts for {total} articles.")
+    return total
+
+INSERT_COLUMNS = ('id, title, url, source, summary, published, published_ts, fetched_at, '
+                  'canonical_url, simhash, story_id, analysis_json, status')
+INSERT_PLACEHOLDERS = ', '.join('?' * len(INSERT_COLUMNS.split(',')))
+
+def _article_params(article_data):
+    """Map an ingest record onto the INSERT_COLUMNS parameter tuple."""
+    return (
+        article_data.get('id'),
+        article_data.get('title'),
+        article_data.get('link') or article_data.get('url'),
+        article_data.get('source'),
+        article_data.get('summary'),
+        article_data.get('published'),
+        _published_ts(article_data),
+        article_data.get('fetched_at', datetime.now().isoformat()),
+        article_data.get('canonical_url'),
+        article_data.get('simhash'),
+        article_data.get('story_id'),
+        json.dumps(article_data['analysis']) if article_data.get('analysis') else None,
+        article_data.get('status', 'ingested'),
+    )
+
 def insert_article(article_data):
     """Insert a new article. Returns True if inserted, False if duplicate."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    try:
-        query = '''
-            INSERT INTO articles (id, title, url, source, summary, published, fetched_at, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, 'ingested')
-        '''
-        cursor.execute(query, (
-            article_data.get('id'),
-            article_data.get('title'),
-            article_data.get('link') or article_data.get('url'),
-            article_data.get('source'),
-            article_data.get('summary'),
-            article_data.get('published'),
-            article_data.get('fetched_at', datetime.now().isoformat())
-        ))
-        conn.commit()
-        if hasattr(conn, 'sync'): conn.sync()
-        return True
-    except Exception as e:
-        if "UNIQUE" in str(e) or "PRIMARY KEY" in str(e):
+    with _connection() as conn:
+        cursor = conn.cursor()
+        
+        try:
+            query = f'''
+                INSERT INTO articles ({INSERT_COLUMNS})
+                VALUES ({INSERT_PLACEHOLDERS})
+            '''
+            cursor.execute(query, _article_params(article_data))
+            conn.commit()
+            _after_write(conn)
+            return True
+        except Exception as e:
+            conn.rollback()
+            if "UNIQUE" in str(e) or "PRIMARY KEY" in str(e):
+                return False
+            print(f"Error inserting article: {e}")
             return False
-        print(f"Error inserting article: {e}")
-        return False
-    finally:
-        conn.close()
+
+def _total_changes(cursor):
+    cursor.execute('SELECT total_changes()')
+    return cursor.fetchone()[0]
+
+def _existing_urls(cursor, urls, chunk_size=500):
+    """Return the subset of urls already stored, querying in chunks."""
+    urls = [u for u in urls if u]
+    found = set()
+    for i in range(0, len(urls), chunk_size):
+        chunk = urls[i:i + chunk_size]
+        placeholders = ', '.join('?' * len(chunk))
+        cursor.execute(f'SELECT url FROM articles WHERE url IN ({placeholders})', chunk)
+        found.update(row[0] for row in cursor.fetchall())
+    return found
+
+def get_known_urls(days=8):
+    """
+    Raw and canonical URLs of articles published in the last `days` days,
+    loaded once per ingest run so already-stored entries are dropped before
+    any write.
+    """
+    cutoff = int(time.time()) - days * 86400
+    with _connection() as conn:
+        _before_read(conn)
+        cursor = conn.cursor()
+        cursor.execute('SELECT url, canonical_url FROM articles WHERE published_ts >= ?', (cutoff,))
+        return {url for row in cursor.fetchall() for url in row if url}
+
+def get_story_fingerprints(days=8):
+    """
+    (id, simhash, title) of canonical stories published in the last `days` days,
+    for building the near-duplicate index. Duplicates and capped rows (never
+    analyzed) are left out, so new copies aren't linked to them.
+    """
+    cutoff = int(time.time()) - days * 86400
+    with _connection() as conn:
+        _before_read(conn)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id, simhash, title FROM articles
+            WHERE published_ts >= ? AND simhash IS NOT NULL AND story_id IS NULL
+              AND status != 'capped'
+        ''', (cutoff,))
+        return cursor.fetchall()
+
+def backfill_fingerprints(fingerprint, days=8, chunk_size=500):
+    """
+    Fill canonical_url/simhash for recent rows stored before those columns
+    existed. fingerprint(url, title, summary) returns (canonical_url, simhash).
+    Returns the number of rows updated.
+    """
+    cutoff = int(time.time()) - days * 86400
+    total = 0
+    with _connection() as conn:
+        cursor = conn.cursor()
+        while True:
+            cursor.execute('''
+                SELECT id, url, title, summary FROM articles
+                WHERE published_ts >= ? AND canonical_url IS NULL LIMIT ?
+            ''', (cutoff, chunk_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            cursor.executemany('UPDATE articles SET canonical_url = ?, simhash = ? WHERE id = ?', [
+                (*fingerprint(row[1] or '', row[2], row[3]), row[0]) for row in rows
+            ])
+            conn.commit()
+            _after_write(conn)
+            total += len(rows)
+    if total:
+        print(f"Backfilled fingerprints for {total} articles.")
+    return total
+
+def insert_articles_bulk(articles):
+    """
+    Insert many articles in one transaction with INSERT OR IGNORE.
+    Returns (inserted_count, skipped) where skipped lists the duplicate records,
+    either already stored or repeated within the batch.
+    """
+    batch = []
+    skipped = []
+    seen = set()
+    for article_data in articles:
+        url = article_data.get('link') or article_data.get('url')
+        if url and url in seen:
+            skipped.append(article_data)
+            continue
+        seen.add(url)
+        batch.append(article_data)
+
+    if not batch:
+        return 0, skipped
+
+    with _connection() as conn:
+        cursor = conn.cursor()
+        try:
+            existing = _existing_urls(cursor, list(seen))
+            rows = []
+            for article_data in batch:
+                if (article_data.get('link') or article_data.get('url')) in existing:
+                    skipped.append(article_data)
+                else:
+                    rows.append(_article_params(article_data))
+
+            before = _total_changes(cursor)
+            cursor.executemany(f'''
+                INSERT OR IGNORE INTO articles ({INSERT_COLUMNS})
+                VALUES ({INSERT_PLACEHOLDERS})
+            ''', rows)
+            inserted = _total_changes(cursor) - before
+            conn.commit()
+            _after_write(conn)
+            return inserted, skipped
+        except Exception as e:
+            conn.rollback()
+            print(f"Error bulk inserting articles: {e}")
+            return 0, skipped
+
+def iter_articles_by_status(status, columns=None, limit=None, batch_size=100):
+    """
+    Stream articles in `status`, newest first, as ArticleRecords holding only
+    `columns` (all columns if None). Rows are fetched batch_size at a time, so
+    memory stays flat however many rows match.
+    """
+    sql = f'SELECT {_projection(columns)} FROM articles WHERE status = ? ORDER BY created_at DESC'
+    params = [status]
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+
+    with _connection() as conn:
+        _before_read(conn)
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        yield from _iter_records(cursor, batch_size)
 
 def get_articles_by_status(status, limit=100):
     """Get articles by their processing status."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT * FROM articles WHERE status = ? ORDER BY created_at DESC LIMIT ?', (status, limit))
-    rows = cursor.fetchall()
-    result = [row_to_dict(cursor, row) for row in rows]
-    conn.close()
-    return result
+    with _connection() as conn:
+        _before_read(conn)
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT * FROM articles WHERE status = ? ORDER BY created_at DESC LIMIT ?', (status, limit))
+        rows = cursor.fetchall()
+        return [row_to_dict(cursor, row) for row in rows]
 
-def update_article_status(article_id, new_status, additional_data=None):
-    """Update an article's status and optionally add data."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    updates = ['status = ?', 'updated_at = ?']
+def claim_articles(status, worker_id, limit=100, lease_seconds=600, columns=None):
+    """
+    Atomically lease up to `limit` articles in `status` to worker_id.
+    Rows leased by another worker are skipped until their lease expires,
+    and rows that recently failed until their next_eligible_at.
+    Returns the claimed rows as ArticleRecords holding `columns`, newest first.
+    """
+    now = time.time()
+    expires = now + lease_seconds
+    with _connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+                UPDATE articles SET claimed_by = ?, lease_expires_at = ?
+                WHERE id IN (
+                    SELECT id FROM articles
+                    WHERE status = ? AND (lease_expires_at IS NULL OR lease_expires_at < ?)
+                      AND (next_eligible_at IS NULL OR next_eligible_at <= ?)
+                    ORDER BY created_at DESC
+                    LIMIT ?
+                )
+            ''', (worker_id, expires, status, now, now, limit))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        # Always pull the claim into the replica, whatever the sync policy,
+        # so the read below sees exactly the rows this worker won
+        _sync(conn)
+
+        cursor.execute(f'''
+            SELECT {_projection(columns)} FROM articles
+            WHERE status = ? AND claimed_by = ? AND lease_expires_at = ?
+            ORDER BY created_at DESC
+        ''', (status, worker_id, expires))
+        return list(_iter_records(cursor))
+
+def _lease_update(sql, params, article_ids):
+    """Run a lease UPDATE over article_ids in one transaction."""
+    article_ids = list(article_ids)
+    if not article_ids:
+        return
+    placeholders = ', '.join('?' * len(article_ids))
+    with _connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'{sql} AND id IN ({placeholders})', list(params) + article_ids)
+        conn.commit()
+        _after_write(conn)
+
+def heartbeat_articles(article_ids, worker_id, lease_seconds=600):
+    """Extend this worker's leases on article_ids."""
+    _lease_update(
+        'UPDATE articles SET lease_expires_at = ? WHERE claimed_by = ?',
+        (time.time() + lease_seconds, worker_id), article_ids
+    )
+
+def release_articles(article_ids, worker_id):
+    """Give back leases this worker still holds so others can claim them now."""
+    _lease_update(
+        'UPDATE articles SET claimed_by = NULL, lease_expires_at = NULL WHERE claimed_by = ?',
+        (worker_id,), article_ids
+    )
+
+@contextmanager
+def claimed_articles(status, limit=100, lease_seconds=600, worker_id=None, columns=None):
+    """
+    Claim a batch for this worker, keep the leases alive from a background
+    thread while the block runs, and release unfinished rows on exit.
+
+        with claimed_articles('filtered', limit=30, columns=['title', 'summary']) as pending:
+            ...
+    """
+    worker_id = worker_id or WORKER_ID
+    articles = claim_articles(status, worker_id, limit, lease_seconds, columns)
+    article_ids = [article['id'] for article in articles]
+    stop = threading.Event()
+
+    def keep_alive():
+        while not stop.wait(lease_seconds / 3):
+            try:
+                heartbeat_articles(article_ids, worker_id, lease_seconds)
+            except Exception as e:
+                print(f"Lease heartbeat failed: {e}")
+
+    heartbeat = threading.Thread(target=keep_alive, daemon=True)
+    if article_ids:
+        heartbeat.start()
+    try:
+        yield articles
+    finally:
+        stop.set()
+        if article_ids:
+            heartbeat.join()
+            release_articles(article_ids, worker_id)
+
+def _status_update(article_id, new_status, additional_data=None):
+    """
+    Build the UPDATE statement and params for one status transition.
+    The WHERE clause only matches rows in a status allowed by TRANSITIONS.
+    """
+    # A status transition completes the work, so it also ends any lease
+    # and resets the failure count for the next stage
+    updates = ['status = ?', 'updated_at = ?', 'claimed_by = NULL', 'lease_expires_at = NULL',
+               'attempts = 0', 'next_eligible_at = NULL']
     params = [new_status, datetime.now().isoformat()]
     
     if additional_data:
@@ -153,39 +839,342 @@ def update_article_status(article_id, new_status, additional_data=None):
             updates.append('critique_json = ?')
             params.append(json.dumps(additional_data['critique']))
     
+    sources = _allowed_from(new_status)
     params.append(article_id)
+    params.extend(sources)
+    placeholders = ', '.join('?' * len(sources))
+    return f'UPDATE articles SET {", ".join(updates)} WHERE id = ? AND status IN ({placeholders})', params
+
+def update_article_status(article_id, new_status, additional_data=None):
+    """
+    Update an article's status and optionally add data.
+    Returns False if the article's current status can't move to new_status.
+    """
+    sql, params = _status_update(article_id, new_status, additional_data)
     
-    cursor.execute(f'UPDATE articles SET {", ".join(updates)} WHERE id = ?', params)
-    conn.commit()
-    if hasattr(conn, 'sync'): conn.sync()
-    conn.close()
+    with _connection() as conn:
+        cursor = conn.cursor()
+        before = _total_changes(cursor)
+        cursor.execute(sql, params)
+        applied = _total_changes(cursor) - before
+        conn.commit()
+        _after_write(conn)
+    if not applied:
+        print(f"Rejected transition of {article_id} to '{new_status}'")
+    return bool(applied)
+
+def update_articles_bulk(updates):
+    """
+    Apply many (article_id, new_status, additional_data) transitions in one
+    transaction. Rows touching the same columns share one executemany.
+    Returns the number of transitions applied; ones not allowed from the
+    row's current status are skipped.
+    """
+    groups = {}
+    count = 0
+    for article_id, new_status, additional_data in updates:
+        sql, params = _status_update(article_id, new_status, additional_data)
+        groups.setdefault(sql, []).append(params)
+        count += 1
+
+    if not groups:
+        return 0
+
+    with _connection() as conn:
+        cursor = conn.cursor()
+        try:
+            before = _total_changes(cursor)
+            for sql, rows in groups.items():
+                cursor.executemany(sql, rows)
+            applied = _total_changes(cursor) - before
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        _after_write(conn)
+    if applied < count:
+        print(f"Rejected {count - applied} of {count} status transitions")
+    return applied
+
+def record_failures(failures):
+    """
+    Count a failed attempt for each (article_id, error, final) in one
+    transaction. The row stays in its status but is not claimable for
+    RETRY_BASE_SECONDS * 2**(attempts - 1); at MAX_ATTEMPTS, or at once when
+    final (retrying can't help, e.g. its image file is gone), it moves to
+    'failed', remembering the status it failed in. Returns the number of
+    rows dead-lettered.
+    """
+    failures = list(failures)
+    if not failures:
+        return 0
+    sources = _allowed_from('failed')
+    placeholders = ', '.join('?' * len(sources))
+    now = time.time()
+    updated_at = datetime.now().isoformat()
+    # A final failure jumps straight to MAX_ATTEMPTS
+    attempts = 'MAX(COALESCE(attempts, 0) + 1, ?)'
+    sql = f'''
+        UPDATE articles SET
+            attempts = {attempts},
+            last_error = ?,
+            updated_at = ?,
+            claimed_by = NULL,
+            lease_expires_at = NULL,
+            next_eligible_at = ? + MIN(?, ? * (1 << COALESCE(attempts, 0))),
+            failed_from = CASE WHEN {attempts} >= ? THEN status END,
+            status = CASE WHEN {attempts} >= ? THEN 'failed' ELSE status END
+        WHERE id = ? AND status IN ({placeholders})
+    '''
+    rows = []
+    for article_id, error, final in failures:
+        floor = MAX_ATTEMPTS if final else 0
+        rows.append([floor, str(error)[:1000], updated_at, now, RETRY_MAX_SECONDS, RETRY_BASE_SECONDS,
+                     floor, MAX_ATTEMPTS, floor, MAX_ATTEMPTS, article_id, *sources])
+    ids = [article_id for article_id, _, _ in failures]
+    with _connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.executemany(sql, rows)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        _after_write(conn)
+        cursor.execute(f'''
+            SELECT COUNT(*) FROM articles WHERE status = 'failed' AND id IN ({', '.join('?' * len(ids))})
+        ''', ids)
+        dead = cursor.fetchone()[0]
+    if dead:
+        print(f"Dead-lettered {dead} articles")
+    return dead
+
+def requeue_failed(article_ids=None, failed_from=None):
+    """
+    Move dead-lettered articles back to the status they failed in with a
+    fresh attempt count. Limit to article_ids and/or one failed_from status;
+    with neither, requeues everything. Returns the number requeued.
+    """
+    conditions = ["status = 'failed'", 'failed_from IS NOT NULL']
+    params = [datetime.now().isoformat()]
+    if failed_from:
+        conditions.append('failed_from = ?')
+        params.append(failed_from)
+    if article_ids is not None:
+        article_ids = list(article_ids)
+        if not article_ids:
+            return 0
+        conditions.append(f"id IN ({', '.join('?' * len(article_ids))})")
+        params.extend(article_ids)
+    with _connection() as conn:
+        cursor = conn.cursor()
+        before = _total_changes(cursor)
+        cursor.execute(f'''
+            UPDATE articles SET status = failed_from, failed_from = NULL, attempts = 0,
+                next_eligible_at = NULL, updated_at = ?
+            WHERE {' AND '.join(conditions)}
+        ''', params)
+        requeued = _total_changes(cursor) - before
+        conn.commit()
+        _after_write(conn)
+    return requeued
+
+class StatusBuffer:
+    """
+    Buffer status transitions and failed attempts and write them with
+    update_articles_bulk / record_failures every max_items results or
+    max_seconds (checked on add), and on exit. A crashed stage loses at most
+    one buffer of results.
+
+        with StatusBuffer() as updates:
+            updates.add(article['id'], 'distilled', {'facts': facts})
+            updates.fail(other['id'], 'Malformed JSON')
+    """
+
+    def __init__(self, max_items=10, max_seconds=30):
+        self.max_items = max_items
+        self.max_seconds = max_seconds
+        self._pending = []
+        self._failures = []
+        self._last_flush = time.monotonic()
+
+    def add(self, article_id, new_status, additional_data=None):
+        self._pending.append((article_id, new_status, additional_data))
+        self._maybe_flush()
+
+    def fail(self, article_id, error, final=False):
+        self._failures.append((article_id, error or 'Unknown error', final))
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if (len(self._pending) + len(self._failures) >= self.max_items
+                or time.monotonic() - self._last_flush >= self.max_seconds):
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            update_articles_bulk(self._pending)
+            self._pending = []
+        if self._failures:
+            record_failures(self._failures)
+            self._failures = []
+        self._last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Results gathered before a crash are still valid, so write them
+        self.flush()
+        return False
 
 def get_feed_articles(limit=50):
     """Get articles ready for the feed."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    with _connection() as conn:
+        _before_read(conn)
+        cursor = conn.cursor()
 
-    cursor.execute('''
-        SELECT * FROM articles 
-        WHERE status = 'visualized' OR status = 'distilled'
-        ORDER BY published DESC 
-        LIMIT ?
-    ''', (limit,))
-    
-    rows = cursor.fetchall()
-    result = [row_to_dict(cursor, row) for row in rows]
-    conn.close()
-    return result
+        cursor.execute(f'''
+            SELECT * FROM articles 
+            WHERE status IN ({FEED_STATUS_SQL})
+            ORDER BY published_ts DESC, id DESC
+            LIMIT ?
+        ''', (limit,))
+        
+        rows = cursor.fetchall()
+        return [row_to_dict(cursor, row) for row in rows]
+
+def encode_feed_cursor(published_ts, article_id):
+    """Opaque cursor for the feed position after (published_ts, id)."""
+    raw = json.dumps([published_ts, article_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_feed_cursor(cursor):
+    """Inverse of encode_feed_cursor. Raises ValueError on a malformed cursor."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        published_ts, article_id = json.loads(base64.urlsafe_b64decode(padded))
+        return int(published_ts), str(article_id)
+    except Exception as e:
+        raise ValueError(f"Invalid feed cursor: {cursor}") from e
+
+def get_feed_page(cursor=None, limit=30, source=None):
+    """
+    Keyset-paginated feed read, newest first. Seeks on (published_ts, id)
+    through idx_feed_published, so page N costs the same as page 1.
+    Returns (articles, next_cursor); next_cursor is None on the last page.
+    """
+    where = [f'status IN ({FEED_STATUS_SQL})']
+    params = []
+    if source:
+        where.append('source = ?')
+        params.append(source)
+    if cursor:
+        where.append('(published_ts, id) < (?, ?)')
+        params.extend(decode_feed_cursor(cursor))
+    params.append(limit)
+
+    with _connection() as conn:
+        _before_read(conn)
+        db_cursor = conn.cursor()
+        db_cursor.execute(f'''
+            SELECT * FROM articles
+            WHERE {' AND '.join(where)}
+            ORDER BY published_ts DESC, id DESC
+            LIMIT ?
+        ''', params)
+        articles = [row_to_dict(db_cursor, row) for row in db_cursor.fetchall()]
+
+    next_cursor = None
+    if len(articles) == limit:
+        last = articles[-1]
+        next_cursor = encode_feed_cursor(last['published_ts'], last['id'])
+    return articles, next_cursor
+
+def get_source_states():
+    """Fetch state for every source, as {source_name: {column: value}}."""
+    with _connection() as conn:
+        _before_read(conn)
+        cursor = conn.cursor()
+        cursor.execute('SELECT * FROM source_state')
+        states = {}
+        for row in cursor.fetchall():
+            state = row_to_dict(cursor, row)
+            states[state.pop('source')] = state
+        return states
+
+def save_source_state(source, state):
+    """Upsert the given SOURCE_STATE_COLUMNS for one source."""
+    state = {k: v for k, v in state.items() if k in SOURCE_STATE_COLUMNS}
+    if not state:
+        return
+    columns = ', '.join(state)
+    placeholders = ', '.join('?' * len(state))
+    updates = ', '.join(f'{name} = excluded.{name}' for name in state)
+    with _connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            INSERT INTO source_state (source, {columns}) VALUES (?, {placeholders})
+            ON CONFLICT(source) DO UPDATE SET {updates}, updated_at = CURRENT_TIMESTAMP
+        ''', (source, *state.values()))
+        conn.commit()
+        _after_write(conn)
+
+def refresh_source_yield(days=14):
+    """
+    Recompute each source's yield over articles published in the last `days`
+    days and store it in source_state. Articles still pending ('ingested'),
+    never enqueued ('duplicate', 'capped') or decided by a routing rule have
+    no relevance outcome and are not counted. Dead-lettered articles count
+    as the status they failed in.
+    Returns {source: {'decided', 'passed', 'visualized', 'ignored'}}.
+    """
+    cutoff = int(time.time()) - days * 86400
+    in_list = lambda statuses: ', '.join(f"'{status}'" for status in statuses)
+    with _connection() as conn:
+        _before_read(conn)
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT source,
+                   COUNT(*),
+                   SUM(stage IN ({in_list(PASSED_STATUSES)})),
+                   SUM(stage IN ({in_list(VISUALIZED_STATUSES)})),
+                   SUM(stage = 'ignored')
+            FROM (
+                SELECT source, COALESCE(failed_from, status) AS stage FROM articles
+                WHERE published_ts >= ? AND json_extract(analysis_json, '$.route') IS NULL
+            )
+            WHERE stage NOT IN ('ingested', 'duplicate', 'capped')
+            GROUP BY source
+        ''', (cutoff,))
+        rows = [tuple(row) for row in cursor.fetchall()]
+        cursor.executemany('''
+            INSERT INTO source_state (source, yield_decided, yield_passed, yield_visualized, yield_ignored)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(source) DO UPDATE SET
+                yield_decided = excluded.yield_decided, yield_passed = excluded.yield_passed,
+                yield_visualized = excluded.yield_visualized, yield_ignored = excluded.yield_ignored
+        ''', rows)
+        conn.commit()
+        _after_write(conn)
+    return {row[0]: dict(zip(('decided', 'passed', 'visualized', 'ignored'), row[1:])) for row in rows}
 
 def get_stats():
     """Get processing statistics."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT status, COUNT(*) as count FROM articles GROUP BY status')
-    rows = cursor.fetchall()
-    result = {row_to_dict(cursor, row)['status']: row_to_dict(cursor, row)['count'] for row in rows}
-    conn.close()
-    return result
+    with _connection() as conn:
+        _before_read(conn)
+        cursor = conn.cursor()
+        cursor.execute('SELECT status, COUNT(*) as count FROM articles GROUP BY status')
+        rows = cursor.fetchall()
+        return {row_to_dict(cursor, row)['status']: row_to_dict(cursor, row)['count'] for row in rows}
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="LLM Lens database maintenance")
+    parser.add_argument("--backfill-published", action="store_true",
+                        help="Recompute missing published_ts values in chunks")
+    args = parser.parse_args()
+
     init_db()
+    if args.backfill_published:
+        backfill_published_ts()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Lens Dead-Letter Queue
+Lists articles moved to 'failed' after MAX_ATTEMPTS failed attempts in a
+stage, and requeues them into the status they failed in.
+
+    python execution/dead_letter.py list [--stage filtered]
+    python execution/dead_letter.py requeue <id> [<id> ...]
+    python execution/dead_letter.py requeue --stage ingested
+    python execution/dead_letter.py requeue --all
+"""
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+import database
+
+LIST_COLUMNS = ['title', 'source', 'failed_from', 'attempts', 'last_error', 'updated_at']
+
+
+def list_failed(stage=None, limit=None):
+    articles = [
+        article for article in database.iter_articles_by_status('failed', columns=LIST_COLUMNS)
+        if not stage or article['failed_from'] == stage
+    ][:limit]
+    if not articles:
+        print("No dead-lettered articles.")
+        return
+    print(f"{'id':<38}{'stage':<12}{'tries':>5}  {'title':<42}last error")
+    for article in articles:
+        error = ' '.join(str(article['last_error'] or '').split())
+        print(f"{article['id']:<38}{article['failed_from'] or '?':<12}{article['attempts'] or 0:>5}  "
+              f"{str(article['title'] or '')[:40]:<42}{error[:80]}")
+    print(f"\n{len(articles)} dead-lettered articles")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and requeue dead-lettered articles")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="Show failed articles and their last error")
+    list_parser.add_argument("--stage", help="Only articles that failed in this status (e.g. 'filtered')")
+    list_parser.add_argument("--limit", type=int, default=None)
+
+    requeue_parser = commands.add_parser("requeue", help="Return failed articles to the status they failed in")
+    requeue_parser.add_argument("ids", nargs="*", help="Article ids to requeue")
+    requeue_parser.add_argument("--stage", help="Requeue everything that failed in this status")
+    requeue_parser.add_argument("--all", action="store_true", help="Requeue every failed article")
+    args = parser.parse_args()
+
+    with database.session():
+        database.init_db()
+        if args.command == "list":
+            list_failed(args.stage, args.limit)
+        else:
+            if not (args.ids or args.stage or args.all):
+                requeue_parser.error("give article ids, --stage or --all")
+            count = database.requeue_failed(args.ids or None, args.stage)
+            print(f"Requeued {count} articles.")
+
+
+if __name__ == "__main__":
+    main()
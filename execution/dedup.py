@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Lens Story Deduplication
+URL canonicalization, SimHash fingerprints and headline matching so the same
+announcement arriving from several outlets/subreddits enters the LLM
+pipeline once.
+"""
+import re
+import html
+import hashlib
+from collections import Counter
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Query parameters that only track the click, never select content
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'ocid', 'cmpid',
+    'smid', 'taid', 'ref', 'ref_src', 'ref_url', 'src', 'source', 'guccounter',
+    'share', 'sh', 'igshid', 'context', 'rdt', 'via',
+}
+TRACKING_PREFIXES = ('utm_', 'at_', 'itm_', 'pk_')
+STRIP_HOST_PREFIXES = ('www.', 'm.', 'amp.', 'old.', 'np.', 'new.')
+HOST_ALIASES = {'export.arxiv.org': 'arxiv.org', 'redd.it': 'reddit.com'}
+
+REDDIT_POST = re.compile(r'^/(?:r/[^/]+/)?comments/([a-z0-9]+)', re.IGNORECASE)
+ARXIV_PAPER = re.compile(r'^/(?:abs|pdf)/([^/]+?)(?:v\d+)?(?:\.pdf)?$', re.IGNORECASE)
+
+SIMHASH_BITS = 64
+NEAR_DUP_DISTANCE = 3  # max differing bits for two fingerprints to be one story
+BANDS = 4              # NEAR_DUP_DISTANCE < BANDS guarantees one band matches exactly
+BAND_BITS = SIMHASH_BITS // BANDS
+
+# Headline matching: syndicated copies keep the headline's content words
+# while summaries differ completely (each outlet writes its own dek, a Reddit
+# link post has none), so the body SimHash only catches verbatim copies.
+TITLE_JACCARD = 0.7    # min token-set overlap for two headlines to be one story
+MIN_TITLE_TOKENS = 3   # shorter headlines ("Weekly Thread") are never matched
+TITLE_TAG = re.compile(r'^\s*(?:\[[^\]]{1,20}\]|\([^)]{1,20}\))\s*')  # [R], [D], (News) ...
+TITLE_STOPWORDS = {
+    'a', 'an', 'the', 'and', 'or', 'of', 'to', 'in', 'on', 'for', 'with', 'by', 'at', 'from',
+    'as', 'is', 'are', 'its', 'it', 'this', 'that', 'new', 'now', 'just', 'you', 'your',
+    'be', 'will', 'has', 'have', 'yet', 'here', 'about',
+}
+# Model tiers: on one side only they mean a different product ('GPT-4o' vs 'GPT-4o mini')
+TITLE_VARIANTS = {'mini', 'nano', 'lite', 'pro', 'ultra', 'max', 'plus', 'turbo', 'flash', 'preview'}
+# Headline verbs outlets use interchangeably for the same announcement
+TITLE_SYNONYMS = {
+    verb: 'launch' for verb in (
+        'announce', 'announces', 'announced', 'unveil', 'unveils', 'unveiled',
+        'launch', 'launches', 'launched', 'release', 'releases', 'released',
+        'introduce', 'introduces', 'introduced', 'debut', 'debuts', 'debuted',
+        'reveal', 'reveals', 'revealed', 'ships', 'shipped',
+    )
+}
+
+
+def canonicalize_url(url):
+    """
+    Normalize a story URL: https, bare lowercase host, no tracking params or
+    fragment, sorted query, no trailing slash. Reddit permalinks collapse to
+    reddit.com/comments/<id> and ArXiv links to arxiv.org/abs/<id> (no version).
+    """
+    if not url:
+        return url
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or '').lower()
+    for prefix in STRIP_HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    host = HOST_ALIASES.get(host, host)
+    path = re.sub(r'/{2,}', '/', parts.path) or '/'
+
+    if host == 'reddit.com':
+        match = REDDIT_POST.match(path)
+        if match:
+            return f"https://reddit.com/comments/{match.group(1).lower()}"
+    if host == 'arxiv.org':
+        match = ARXIV_PAPER.match(path)
+        if match:
+            return f"https://arxiv.org/abs/{match.group(1)}"
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    if len(path) > 1:
+        path = path.rstrip('/')
+    return urlunsplit(('https', host, path, urlencode(query), ''))
+
+
+def _tokens(text):
+    text = html.unescape(re.sub(r'<[^>]+>', ' ', text or ''))
+    return re.findall(r'[a-z0-9]+', text.lower())
+
+
+def simhash(title, summary=''):
+    """
+    64-bit SimHash over word unigrams and bigrams of title + summary.
+    The title is counted twice: it is what syndicated copies share most.
+    """
+    words = _tokens(title) * 2 + _tokens(summary)[:300]
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    if not features:
+        return 0
+
+    weights = [0] * SIMHASH_BITS
+    for feature in features:
+        h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), 'big')
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def _stem(word):
+    """Crude suffix folding so 'invests'/'invest' and 'comes'/'coming' match."""
+    if len(word) <= 4 or any(c.isdigit() for c in word):
+        return word
+    for suffix in ('ing', 'ed', 'es', 's'):
+        if word.endswith(suffix) and not word.endswith('ss') and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            break
+    return word[:-1] if word.endswith('e') and len(word) > 4 else word
+
+
+def title_tokens(title):
+    """
+    Content words of a headline: no Reddit tags or stopwords, suffixes folded
+    and launch verbs merged. Version numbers stay whole ('3.1', '4o').
+    """
+    text = html.unescape(re.sub(r'<[^>]+>', ' ', title or '')).lower()
+    while TITLE_TAG.match(text):
+        text = TITLE_TAG.sub('', text, count=1)
+    tokens = set()
+    text = re.sub(r"['\u2019]s\b", '', text)
+    for word in re.findall(r'[a-z0-9]+(?:[.,][0-9]+)*', text):
+        if word in TITLE_STOPWORDS:
+            continue
+        tokens.add(_stem(TITLE_SYNONYMS.get(word, word)))
+    return frozenset(tokens)
+
+
+def same_headline(a, b, min_jaccard=TITLE_JACCARD):
+    """
+    Whether two title_tokens() sets name the same story: enough shared words,
+    and no number, version or model tier on one side only ('Llama 3' vs
+    'Llama 3.1', 'GPT-4o' vs 'GPT-4o mini').
+    """
+    if len(a) < MIN_TITLE_TOKENS or len(b) < MIN_TITLE_TOKENS:
+        return False
+    if any(token in TITLE_VARIANTS or any(c.isdigit() for c in token) for token in a ^ b):
+        return False
+    return len(a & b) / len(a | b) >= min_jaccard
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def to_signed64(value):
+    """SQLite INTEGER is signed; store the unsigned fingerprint's bit pattern."""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def from_signed64(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+class SimhashIndex:
+    """
+    In-memory near-duplicate index. Fingerprints are split into BANDS bands;
+    any two within NEAR_DUP_DISTANCE bits share at least one band exactly, so
+    a lookup only compares against that band's bucket.
+    """
+
+    def __init__(self, max_distance=NEAR_DUP_DISTANCE):
+        self.max_distance = max_distance
+        self._buckets = [{} for _ in range(BANDS)]
+
+    def _bands(self, fingerprint):
+        mask = (1 << BAND_BITS) - 1
+        return [(fingerprint >> (i * BAND_BITS)) & mask for i in range(BANDS)]
+
+    def add(self, fingerprint, story_id):
+        if not fingerprint:
+            return
+        for bucket, band in zip(self._buckets, self._bands(fingerprint)):
+            bucket.setdefault(band, []).append((fingerprint, story_id))
+
+    def find(self, fingerprint):
+        """story_id of the closest indexed fingerprint within max_distance, else None."""
+        if not fingerprint:
+            return None
+        best = None
+        for bucket, band in zip(self._buckets, self._bands(fingerprint)):
+            for candidate, story_id in bucket.get(band, ()):
+                distance = hamming(fingerprint, candidate)
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, story_id)
+        return best[1] if best else None
+
+
+class TitleIndex:
+    """
+    In-memory headline index. An inverted index from title token to stories
+    yields the candidates sharing a word; same_headline() decides.
+    """
+
+    def __init__(self, min_jaccard=TITLE_JACCARD):
+        self.min_jaccard = min_jaccard
+        self._titles = {}
+        self._postings = {}
+
+    def add(self, title, story_id):
+        tokens = title_tokens(title)
+        if len(tokens) < MIN_TITLE_TOKENS:
+            return
+        self._titles[story_id] = tokens
+        for token in tokens:
+            self._postings.setdefault(token, []).append(story_id)
+
+    def find(self, title):
+        """story_id of the indexed headline with the most overlap that is the same story, else None."""
+        tokens = title_tokens(title)
+        if len(tokens) < MIN_TITLE_TOKENS:
+            return None
+        shared = Counter(story_id for token in tokens for story_id in self._postings.get(token, ()))
+        best = None
+        for story_id, overlap in shared.items():
+            other = self._titles[story_id]
+            jaccard = overlap / len(tokens | other)
+            if (best is None or jaccard > best[0]) and same_headline(tokens, other, self.min_jaccard):
+                best = (jaccard, story_id)
+        return best[1] if best else None
+
+
+class StoryIndex:
+    """Canonical stories, matched by body SimHash (verbatim copies) or by headline."""
+
+    def __init__(self):
+        self.bodies = SimhashIndex()
+        self.titles = TitleIndex()
+
+    def add(self, story_id, fingerprint, title):
+        self.bodies.add(fingerprint, story_id)
+        self.titles.add(title, story_id)
+
+    def find(self, fingerprint, title):
+        return self.bodies.find(fingerprint) or self.titles.find(title)
+
+
+def fingerprint(url, title, summary=''):
+    """(canonical_url, simhash as stored) for an article."""
+    return canonicalize_url(url), to_signed64(simhash(title, summary))
@@ -6,13 +6,14 @@ Processes 'ingested' articles and moves them to 'distilled'.
 import os
 import sys
 import json
-import time
 from pathlib import Path
 from google import genai
 from google.genai import types
 
 sys.path.append(str(Path(__file__).parent))
-from database import get_articles_by_status, update_article_status
+from database import claimed_articles, session, StatusBuffer
+import llm_executor
+import gemini_client
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -22,8 +23,13 @@ client = genai.Client(api_key=os.getenv('GEMINI_API_KEY') or os.getenv('GOOGLE_A
 
 # UPGRADED TO GEMINI 3 FLASH for hackathon requirements
 MODEL_ID = "gemini-3-flash-preview"
+DISTILL_COLUMNS = ['title', 'summary', 'source']
 
-def distill_article(article_data, max_retries=3):
+def valid_facts(facts):
+    """Whether a distillation answer has the shape the later stages rely on."""
+    return isinstance(facts, dict) and bool(facts.get('headline'))
+
+def distill_article(article_data):
     """Call Gemini 3 to extract structured facts and a clean headline."""
     prompt = f"""
     Extract structured facts from this AI news item for an infographic.
@@ -54,59 +60,62 @@ def distill_article(article_data, max_retries=3):
     }}
     """
     
-    for attempt in range(max_retries):
-        try:
-            response = client.models.generate_content(
-                model=MODEL_ID,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json"
-                )
-            )
+    try:
+        response = gemini_client.generate_content(
+            client,
+            model=MODEL_ID,
+            contents=prompt,
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json"
+            ),
+            accept=gemini_client.json_where(valid_facts)
+        )
+        
+        if not response.text:
+            raise ValueError("Empty response text")
             
-            if not response.text:
-                raise ValueError("Empty response text")
-                
-            facts = json.loads(response.text)
-            return facts
-        except Exception as e:
-            if "429" in str(e) or "quota" in str(e).lower():
-                wait_time = (attempt + 1) * 10
-                print(f"  ! Quota hit (429). Retrying in {wait_time}s... (Attempt {attempt+1}/{max_retries})")
-                time.sleep(wait_time)
-            else:
-                print(f"Error distilling article with Gemini 3: {e}")
-                break
-    return None
+        facts = json.loads(response.text)
+        if not valid_facts(facts):
+            raise ValueError(f"Malformed facts: {response.text[:200]}")
+        return facts
+    except Exception as e:
+        print(f"Error distilling article with Gemini 3: {e}")
+        raise
 
 def main():
     """Process pending articles in moderate batches."""
-    pending = get_articles_by_status('filtered', limit=30)
-    print(f"Found {len(pending)} articles to distill with {MODEL_ID}")
-    
     distilled_count = 0
-    for article in pending:
-        # SKIP ArXiv articles as requested
-        source = str(article.get('source', '')).lower()
-        if 'arxiv' in source:
-            print(f"Skipping ArXiv article: {article['title'][:40]}...")
-            # Mark it as ignored or just leave it filtered? 
-            # User said stop generating infographic, so we should skip it.
-            update_article_status(article['id'], 'ignored', {})
-            continue
+    with claimed_articles('filtered', limit=30, columns=DISTILL_COLUMNS) as pending, StatusBuffer() as updates:
+        print(f"Found {len(pending)} articles to distill with {MODEL_ID}")
+        
+        to_distill = []
+        for article in pending:
+            # SKIP ArXiv articles as requested
+            source = str(article.get('source', '')).lower()
+            if 'arxiv' in source:
+                print(f"Skipping ArXiv article: {article['title'][:40]}...")
+                # Mark it as ignored or just leave it filtered? 
+                # User said stop generating infographic, so we should skip it.
+                updates.add(article['id'], 'ignored', {})
+                continue
+            to_distill.append(article)
 
-        print(f"Distilling: {article['title'][:50]}...")
-        facts = distill_article(article)
+        # Gemini calls run concurrently; results are written here as they finish
+        for article, facts, error in llm_executor.run(distill_article, to_distill):
         
-        if facts:
-            # Update article with facts and change status
-            update_article_status(article['id'], 'distilled', {'facts': facts})
-            distilled_count += 1
-            print(f"✓ Distilled (Gemini 3): {facts.get('headline')}")
-        else:
-            print(f"✗ Failed to distill: {article['id']}")
+            if facts:
+                # Update article with facts and change status
+                updates.add(article['id'], 'distilled', {'facts': facts})
+                distilled_count += 1
+                print(f"✓ Distilled (Gemini 3): {facts.get('headline')}")
+            else:
+                print(f"✗ Failed to distill: {article['title'][:50]}...")
+                if gemini_client.counts_as_attempt(error):
+                    updates.fail(article['id'], error or 'No facts returned')
             
     print(f"\nDistilling finished. Finalized {distilled_count} articles using Gemini 3.")
+    gemini_client.print_metrics()
 
 if __name__ == "__main__":
-    main()
+    with session():
+        main()
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Lens Gemini Client
+Single entry point for generate_content calls, with a content-addressed
+response cache in a local SQLite file. A crashed cycle or a reprocessed
+article replays byte-identical prompts from the cache instead of paying
+for them again.
+
+Entries are keyed by sha256 of (model, contents, config), expire after
+GEMINI_CACHE_TTL_HOURS and are evicted least-recently-used once the file
+holds more than GEMINI_CACHE_MAX_MB. Set GEMINI_CACHE=0 (or pass
+cache=False) to bypass it.
+
+Calls that reach the API get a per-call deadline and are retried on
+transient errors (timeouts, 429, 5xx) with jittered exponential backoff,
+waiting the server's retry hint when it sends one. A per-model circuit
+breaker fails calls fast once a model keeps failing, so a stage does
+not burn the cycle on timeouts while the API is down.
+
+    python execution/gemini_client.py --stats   # entries and size
+    python execution/gemini_client.py --clear
+"""
+import os
+import sys
+import json
+import time
+import base64
+import random
+import sqlite3
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+import httpx
+from google.genai import errors, types
+
+sys.path.append(str(Path(__file__).parent))
+import llm_executor
+
+CACHE_PATH = os.getenv("GEMINI_CACHE_PATH", os.path.join(os.getcwd(), 'gemini_cache.db'))
+CACHE_ENABLED = os.getenv("GEMINI_CACHE", "1") != "0"
+CACHE_TTL = float(os.getenv("GEMINI_CACHE_TTL_HOURS", "168")) * 3600
+CACHE_MAX_BYTES = int(float(os.getenv("GEMINI_CACHE_MAX_MB", "256")) * 1024 * 1024)
+EVICT_TO = 0.9  # evict down to this fraction of the bound, so we don't evict on every store
+
+# Per-attempt deadlines in seconds (image generation is slow)
+DEADLINES = {'gemini-3-pro-image-preview': 180.0}
+DEFAULT_DEADLINE = float(os.getenv("GEMINI_DEADLINE", "90"))
+MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+BACKOFF_BASE = 2.0        # seconds; retry n waits up to BACKOFF_BASE * 2**n
+BACKOFF_MAX = 60.0
+RETRY_HINT_MAX = 120.0    # longest server-requested wait we will honor
+RETRY_CODES = {408, 429, 500, 502, 503, 504}
+BREAKER_THRESHOLD = int(os.getenv("GEMINI_BREAKER_THRESHOLD", "5"))  # consecutive failures to open
+BREAKER_COOLDOWN = float(os.getenv("GEMINI_BREAKER_COOLDOWN", "120"))
+
+_conn = None
+_lock = threading.Lock()
+_local = threading.local()
+_metrics = {'hits': 0, 'misses': 0, 'stores': 0, 'expired': 0, 'evicted': 0, 'bypassed': 0,
+            'retries': 0, 'failures': 0, 'short_circuited': 0}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the API while a model's breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive retryable failures and rejects calls
+    for `cooldown` seconds. After that a single trial call is let through
+    (half-open): success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            remaining = self.opened_at + self.cooldown - time.monotonic()
+            if remaining > 0 or self._trial:
+                raise CircuitOpenError(f"circuit open after {self.failures} consecutive failures "
+                                       f"({max(remaining, 0):.0f}s left)")
+            self._trial = True
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def failure(self):
+        """Record a failure; returns True if the breaker is now open."""
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            return self.opened_at is not None
+
+    def release(self):
+        """End a call that says nothing about the API; the next caller may take the trial."""
+        with self._lock:
+            self._trial = False
+
+
+_breakers = {}
+
+
+def _breaker(model):
+    with _lock:
+        return _breakers.setdefault(model, CircuitBreaker())
+
+
+def _connect():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        _conn.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT,
+                size INTEGER,
+                created_at REAL,
+                accessed_at REAL
+            )
+        ''')
+        _conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)')
+        _conn.commit()
+    return _conn
+
+
+def _canonical(value):
+    """JSON-able form of contents/config: pydantic models dumped, bytes base64'd."""
+    if hasattr(value, 'model_dump'):
+        return value.model_dump(mode='json', exclude_none=True)
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _canonical(v) for k, v in value.items()}
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode()
+    return value
+
+
+def cache_key(model, contents, config=None):
+    payload = json.dumps([model, _canonical(contents), _canonical(config)], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _lookup(key):
+    now = time.time()
+    with _lock:
+        conn = _connect()
+        row = conn.execute('SELECT response, created_at FROM responses WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        if now - row[1] > CACHE_TTL:
+            conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            conn.commit()
+            _metrics['expired'] += 1
+            return None
+        conn.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key))
+        conn.commit()
+    return types.GenerateContentResponse.model_validate_json(row[0])
+
+
+def _forget(key):
+    try:
+        with _lock:
+            conn = _connect()
+            conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            conn.commit()
+    except sqlite3.Error as e:
+        print(f"  Gemini cache delete failed: {e}")
+
+
+def _evict(conn):
+    """Drop expired entries, then least recently used ones until under EVICT_TO of the bound."""
+    conn.execute('DELETE FROM responses WHERE created_at < ?', (time.time() - CACHE_TTL,))
+    total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+    if total <= CACHE_MAX_BYTES:
+        return
+    target = CACHE_MAX_BYTES * EVICT_TO
+    doomed = []
+    for key, size in conn.execute('SELECT key, size FROM responses ORDER BY accessed_at'):
+        if total <= target:
+            break
+        doomed.append((key,))
+        total -= size
+    conn.executemany('DELETE FROM responses WHERE key = ?', doomed)
+    _metrics['evicted'] += len(doomed)
+
+
+def _store(key, model, response):
+    body = response.model_dump_json(exclude_none=True)
+    now = time.time()
+    with _lock:
+        conn = _connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO responses (key, model, response, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)',
+            (key, model, body, len(body), now, now)
+        )
+        _evict(conn)
+        conn.commit()
+        _metrics['stores'] += 1
+
+
+def _retry_hint(error):
+    """Seconds the server asked us to wait (Retry-After or google.rpc.RetryInfo), else None."""
+    hint = None
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        hint = float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        pass
+    body = error.details.get('error', {}) if isinstance(error.details, dict) else {}
+    for detail in body.get('details') or []:
+        if isinstance(detail, dict) and str(detail.get('@type', '')).endswith('RetryInfo'):
+            try:
+                hint = float(str(detail.get('retryDelay', '')).rstrip('s'))
+            except ValueError:
+                pass
+    return None if hint is None else min(max(hint, 0.0), RETRY_HINT_MAX)
+
+
+def classify_error(error):
+    """
+    (retryable, retry hint seconds or None). Timeouts, dropped connections,
+    408/429 and 5xx are retryable; other API errors (bad request, auth,
+    not found, blocked) and anything else are fatal.
+    """
+    if isinstance(error, errors.APIError):
+        return error.code in RETRY_CODES, _retry_hint(error)
+    if isinstance(error, httpx.TransportError):
+        return True, None
+    return False, None
+
+
+def _backoff(attempt):
+    """Full-jitter exponential backoff for retry number `attempt` (0-based)."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def _with_deadline(model, config):
+    """config with the model's per-attempt timeout and the SDK's own retries off."""
+    options = types.HttpOptions(
+        timeout=int(DEADLINES.get(model, DEFAULT_DEADLINE) * 1000),
+        retry_options=types.HttpRetryOptions(attempts=1),
+    )
+    if config is None:
+        return types.GenerateContentConfig(http_options=options)
+    return config.model_copy(update={'http_options': options})
+
+
+def _call(client, model, contents, config=None, retries=MAX_RETRIES):
+    """One rate-limited API call per attempt, with deadline, retries and circuit breaking."""
+    breaker = _breaker(model)
+    config = _with_deadline(model, config)
+    for attempt in range(retries + 1):
+        try:
+            breaker.before_call()
+        except CircuitOpenError:
+            with _lock:
+                _metrics['short_circuited'] += 1
+            raise
+        try:
+            response = llm_executor.generate_content(client, model=model, contents=contents, config=config)
+        except Exception as e:
+            retryable, hint = classify_error(e)
+            if not retryable:
+                if isinstance(e, errors.APIError):
+                    breaker.success()  # the API answered; the request itself is bad
+                else:
+                    breaker.release()
+                with _lock:
+                    _metrics['failures'] += 1
+                raise
+            give_up = breaker.failure() or attempt == retries
+            with _lock:
+                _metrics['failures' if give_up else 'retries'] += 1
+            if give_up:
+                raise
+            delay = hint + random.uniform(0, 1) if hint is not None else _backoff(attempt)
+            reason = f"HTTP {e.code}" if isinstance(e, errors.APIError) else type(e).__name__
+            print(f"  {model}: {reason}, retrying in {delay:.1f}s ({attempt + 1}/{retries})")
+            time.sleep(delay)
+            continue
+        breaker.success()
+        return response
+
+
+def counts_as_attempt(error):
+    """
+    Whether a stage failure should count against the article (see
+    database.record_failures). Not when the model's circuit was open: the
+    call never ran, and the API being down says nothing about the item.
+    """
+    return not isinstance(error, CircuitOpenError)
+
+
+def has_content(response):
+    """Default acceptance test: the response carries at least one part."""
+    return bool(response.candidates and response.candidates[0].content and response.candidates[0].content.parts)
+
+
+def json_where(check):
+    """
+    Acceptance test for JSON-mode calls: the body parses and check(parsed)
+    holds. Pass the stage's own validator, so an answer the stage would
+    reject is never cached and a retry asks the model again.
+    """
+    def accept(response):
+        try:
+            return bool(check(json.loads(response.text)))
+        except (TypeError, ValueError):
+            return False
+    return accept
+
+
+def generate_content(client, model, contents, config=None, cache=True, accept=has_content):
+    """
+    client.models.generate_content through the response cache. Misses go to
+    the API via llm_executor's rate limits, with deadlines, retries and the
+    model's circuit breaker (CircuitOpenError while it is open). The
+    response is stored only if accept(response) holds, and a cached one
+    that fails it is dropped, so a malformed answer is never replayed.
+    """
+    _local.cached = False
+    if not (cache and CACHE_ENABLED):
+        with _lock:
+            _metrics['bypassed'] += 1
+        return _call(client, model, contents, config)
+
+    key = cache_key(model, contents, config)
+    try:
+        response = _lookup(key)
+    except (sqlite3.Error, ValueError) as e:
+        print(f"  Gemini cache read failed: {e}")
+        response = None
+    if response is not None and not accept(response):
+        _forget(key)
+        response = None
+    if response is not None:
+        with _lock:
+            _metrics['hits'] += 1
+        _local.cached = True
+        return response
+
+    with _lock:
+        _metrics['misses'] += 1
+    response = _call(client, model, contents, config)
+    if accept(response):
+        try:
+            _store(key, model, response)
+        except sqlite3.Error as e:
+            print(f"  Gemini cache write failed: {e}")
+    return response
+
+
+def last_from_cache():
+    """Whether this thread's last generate_content() was served from the cache."""
+    return getattr(_local, 'cached', False)
+
+
+def get_metrics():
+    with _lock:
+        return dict(_metrics)
+
+
+def print_metrics():
+    m = get_metrics()
+    lookups = m['hits'] + m['misses']
+    if not lookups and not m['bypassed']:
+        return
+    rate = m['hits'] / lookups if lookups else 0.0
+    print(f"Gemini cache: {m['hits']} hits, {m['misses']} misses ({rate:.0%} hit rate), "
+          f"{m['stores']} stored, {m['expired']} expired, {m['evicted']} evicted, {m['bypassed']} bypassed")
+    print(f"Gemini calls: {m['retries']} retries, {m['failures']} failed, "
+          f"{m['short_circuited']} rejected by an open circuit")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gemini response cache")
+    parser.add_argument("--stats", action="store_true", help="Show entries and size per model")
+    parser.add_argument("--clear", action="store_true", help="Delete every cached response")
+    args = parser.parse_args()
+
+    conn = _connect()
+    if args.clear:
+        conn.execute('DELETE FROM responses')
+        conn.commit()
+        conn.execute('VACUUM')
+        print(f"Cleared {CACHE_PATH}")
+    elif args.stats:
+        print(f"{CACHE_PATH} (TTL {CACHE_TTL / 3600:.0f}h, bound {CACHE_MAX_BYTES / 1024 / 1024:.0f} MB)")
+        print(f"{'model':<32}{'entries':>9}{'MB':>9}")
+        for model, entries, size in conn.execute(
+                'SELECT model, COUNT(*), SUM(size) FROM responses GROUP BY model ORDER BY model'):
+            print(f"{model:<32}{entries:>9}{size / 1024 / 1024:>9.2f}")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
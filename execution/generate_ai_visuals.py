@@ -5,15 +5,15 @@ Uses the generate_content pattern for multimodal image generation.
 """
 import os
 import sys
-import json
-import time
 from pathlib import Path
 from google import genai
 from google.genai import types
 from PIL import Image
 
 sys.path.append(str(Path(__file__).parent))
-from database import get_articles_by_status, update_article_status
+from database import claimed_articles, session, StatusBuffer
+import llm_executor
+import gemini_client
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -28,17 +28,14 @@ client = genai.Client(api_key=API_KEY)
 
 # Nano Banana Pro is accessed via gemini-3-pro-image-preview
 MODEL_ID = "gemini-3-pro-image-preview"
+VISUAL_COLUMNS = ['title', 'headline', 'facts_json']
 
 def create_visual_prompt(post):
     """Generate a detailed prompt for Nano Banana Pro image generation."""
     headline = post.get('headline') or post.get('title') or 'News Update'
     
     # Parse facts for key stats
-    facts = post.get('facts_json')
-    if isinstance(facts, str):
-        facts = json.loads(facts)
-    elif not facts:
-        facts = {}
+    facts = post.facts or {}
     
     key_stats = facts.get('key_stats', [])
     stats_text = ', '.join(key_stats[:3]) if key_stats else "key technological metrics"
@@ -69,8 +66,12 @@ Make it look premium, high-tech, and visually striking. Use symbols, icons, and
     
     return prompt
 
+def has_image(response):
+    """Only responses that carry an image are worth caching."""
+    return any(part.inline_data for part in response.parts or [])
+
 def generate_infographic(post, output_path):
-    """Generate an infographic using Nano Banana Pro pattern."""
+    """Generate an infographic using Nano Banana Pro pattern. Returns True once saved; raises on failure."""
     try:
         # Create prompt
         prompt = create_visual_prompt(post)
@@ -78,9 +79,11 @@ def generate_infographic(post, output_path):
         
         # Call Gemini 3 Pro Image (Nano Banana Pro) using generate_content pattern
         print(f"Calling Nano Banana Pro ({MODEL_ID})...")
-        response = client.models.generate_content(
+        response = gemini_client.generate_content(
+            client,
             model=MODEL_ID,
             contents=[prompt],
+            accept=has_image
         )
         
         # Extract and save the image
@@ -106,49 +109,56 @@ def generate_infographic(post, output_path):
         
         if not found_image:
             print(f"✗ No image found in response parts. Parts: {[type(p) for p in response.parts]}")
-            return False
+            raise ValueError("No image in response")
         
         return True
             
     except Exception as e:
         print(f"✗ API Error generating image: {e}")
-        return False
+        raise
 
 def main():
     """Generate infographics for articles without visuals."""
     output_dir = Path('web/public/feed')
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Get articles needing visuals
-    pending = get_articles_by_status('distilled', limit=10)
-    print(f"Found {len(pending)} articles needing visuals")
-    
     generated = 0
-    for i, post in enumerate(pending, 1):
-        print(f"[{i}/{len(pending)}] Processing: {post['title'][:50]}...")
-        
-        # Create safe filename
-        safe_title = "".join([c if c.isalnum() else "_" for c in post['title']])[:30]
-        filename = f"{safe_title}_{post['id'][:8]}.png"
-        output_path = output_dir / filename
+    # Lease articles needing visuals (image calls are slow, heartbeats keep the lease)
+    with claimed_articles('verified', limit=10, columns=VISUAL_COLUMNS) as pending, StatusBuffer() as updates:
+        print(f"Found {len(pending)} articles needing visuals")
         
-        # Skip if already exists but update status
-        if output_path.exists():
-            print(f"  ⊙ Already exists, updating status")
-            update_article_status(post['id'], 'visualized', {'image_path': f"/feed/{filename}"})
-            continue
+        jobs = []
+        for i, post in enumerate(pending, 1):
+            print(f"[{i}/{len(pending)}] Processing: {post['title'][:50]}...")
         
-        # Generate
-        if generate_infographic(post, str(output_path)):
-            update_article_status(post['id'], 'visualized', {'image_path': f"/feed/{filename}"})
-            generated += 1
-            # Rate limiting / Quota safety for high-res generation
-            time.sleep(3)
+            # Create safe filename
+            safe_title = "".join([c if c.isalnum() else "_" for c in post['title']])[:30]
+            filename = f"{safe_title}_{post['id'][:8]}.png"
+            output_path = output_dir / filename
         
-        print()  # Blank line between items
+            # Skip if already exists but update status
+            if output_path.exists():
+                print(f"  ⊙ Already exists, updating status")
+                updates.add(post['id'], 'visualized', {'image_path': f"/feed/{filename}"})
+                continue
+            jobs.append((post, filename, output_path))
+
+        # Generate concurrently; the model's image quota is enforced by llm_executor
+        def generate(job):
+            post, _, output_path = job
+            return generate_infographic(post, str(output_path))
+
+        for (post, filename, _), ok, error in llm_executor.run(generate, jobs):
+            if ok:
+                updates.add(post['id'], 'visualized', {'image_path': f"/feed/{filename}"})
+                generated += 1
+            elif gemini_client.counts_as_attempt(error):
+                updates.fail(post['id'], error)
     
     print(f"\n✅ Finished. Generated {generated} new infographics using Nano Banana Pro pattern.")
     print(f"   View them at http://localhost:3000/dashboard")
+    gemini_client.print_metrics()
 
 if __name__ == "__main__":
-    main()
+    with session():
+        main()
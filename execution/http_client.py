@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Lens HTTP Client
+Shared fetch layer for every ingest source: one pooled keep-alive session,
+gzip, bounded retries with jittered exponential backoff (honoring
+Retry-After), per-host request spacing and per-host latency metrics.
+"""
+import time
+import random
+import hashlib
+import threading
+import statistics
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Minimum seconds between request starts per host (subdomains included)
+HOST_INTERVALS = {
+    'reddit.com': 2.0,   # unauthenticated JSON API rate limit
+    'arxiv.org': 3.0,    # ArXiv API terms ask for 3s between calls
+}
+DEFAULT_INTERVAL = 0.0
+USER_AGENT = 'LLMLens/1.0'
+TIMEOUT = 15
+MAX_RETRIES = 3           # directive 10_ingest_news: retry network failures 3 times
+BACKOFF_BASE = 1.0        # seconds; attempt n waits up to BACKOFF_BASE * 2**n
+BACKOFF_MAX = 30.0
+RETRY_AFTER_MAX = 120.0   # longest server-requested wait we will honor
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+POOL_SIZE = 16
+
+
+class HostThrottle:
+    """
+    Per-host spacing of request starts. Each caller reserves the host's next
+    free slot under a lock and sleeps outside it, so waiting on one host
+    never blocks requests to another.
+    """
+
+    def __init__(self, intervals=None, default=DEFAULT_INTERVAL):
+        self.intervals = dict(HOST_INTERVALS if intervals is None else intervals)
+        self.default = default
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def _key(self, url):
+        parts = urlsplit(url)
+        host = (parts.hostname or '').lower()
+        for domain in self.intervals:
+            if domain in (parts.netloc.lower(), host) or host.endswith('.' + domain):
+                return domain
+        return parts.netloc.lower()
+
+    def wait(self, url):
+        """Block until url's host may be requested again. Returns seconds waited."""
+        key = self._key(url)
+        interval = self.intervals.get(key, self.default)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(key, 0.0))
+            self._next_slot[key] = slot + interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+throttle = HostThrottle()
+
+
+def wait_for_host(url):
+    return throttle.wait(url)
+
+
+def _make_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({'User-Agent': USER_AGENT, 'Accept-Encoding': 'gzip, deflate'})
+    return session
+
+
+_session = _make_session()
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def _record(url, seconds=None, nbytes=0, retried=False, failed=False):
+    host = urlsplit(url).netloc.lower()
+    with _metrics_lock:
+        m = _metrics.setdefault(host, {'requests': 0, 'retries': 0, 'errors': 0, 'bytes': 0, 'latencies': []})
+        if seconds is not None:
+            m['requests'] += 1
+            m['latencies'].append(seconds)
+        m['bytes'] += nbytes
+        m['retries'] += retried
+        m['errors'] += failed
+
+
+def get_metrics():
+    """Per-host {requests, retries, errors, bytes, p50_ms, p95_ms, max_ms}."""
+    with _metrics_lock:
+        summary = {}
+        for host, m in _metrics.items():
+            latencies = sorted(m['latencies'])
+            summary[host] = {
+                'requests': m['requests'], 'retries': m['retries'],
+                'errors': m['errors'], 'bytes': m['bytes'],
+                'p50_ms': statistics.median(latencies) * 1000 if latencies else 0.0,
+                'p95_ms': latencies[int(0.95 * (len(latencies) - 1))] * 1000 if latencies else 0.0,
+                'max_ms': latencies[-1] * 1000 if latencies else 0.0,
+            }
+        return summary
+
+
+def reset_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def print_metrics():
+    metrics = get_metrics()
+    if not metrics:
+        return
+    print(f"\n{'host':<32}{'reqs':>6}{'retry':>7}{'err':>5}{'p50 ms':>9}{'p95 ms':>9}")
+    for host, m in sorted(metrics.items()):
+        print(f"{host:<32}{m['requests']:>6}{m['retries']:>7}{m['errors']:>5}{m['p50_ms']:>9.0f}{m['p95_ms']:>9.0f}")
+
+
+def _retry_after(response):
+    """Seconds requested by a Retry-After header (delta or HTTP date), else None."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), RETRY_AFTER_MAX)
+
+
+def _backoff(attempt):
+    """Full-jitter exponential backoff for retry number `attempt` (0-based)."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def get(url, headers=None, timeout=TIMEOUT, retries=MAX_RETRIES):
+    """
+    GET through the shared session. Connection errors, timeouts and
+    RETRY_STATUSES are retried up to `retries` times, waiting Retry-After if
+    the server sent one, else a jittered exponential backoff. Returns the
+    last response (callers check the status) or raises the last network error.
+    """
+    for attempt in range(retries + 1):
+        wait_for_host(url)
+        start = time.perf_counter()
+        try:
+            response = _session.get(url, headers=headers, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            _record(url, time.perf_counter() - start, retried=attempt < retries, failed=attempt == retries)
+            if attempt == retries:
+                raise
+            delay = _backoff(attempt)
+            print(f"  Retrying {urlsplit(url).netloc} in {delay:.1f}s ({type(e).__name__})")
+            time.sleep(delay)
+            continue
+
+        retry = response.status_code in RETRY_STATUSES and attempt < retries
+        _record(url, time.perf_counter() - start, len(response.content), retried=retry,
+                failed=response.status_code >= 400 and not retry)
+        if not retry:
+            return response
+        delay = _retry_after(response)
+        delay = _backoff(attempt) if delay is None else delay
+        print(f"  Retrying {urlsplit(url).netloc} in {delay:.1f}s (HTTP {response.status_code})")
+        time.sleep(delay)
+
+
+def conditional_get(url, state=None, headers=None):
+    """
+    GET url politely, revalidating against a previous fetch's state
+    (etag / last_modified / content_hash, as stored in source_state).
+
+    Returns (content, new_state, bytes_downloaded). content is None when the
+    server answered 304 or the body is byte-identical to the last fetch,
+    i.e. there is nothing new to parse.
+    """
+    state = state if state and state.get('url') == url else {}
+    headers = dict(headers or {})
+    if state.get('etag'):
+        headers['If-None-Match'] = state['etag']
+    if state.get('last_modified'):
+        headers['If-Modified-Since'] = state['last_modified']
+
+    response = get(url, headers=headers)
+    if response.status_code == 304:
+        return None, state, 0
+    response.raise_for_status()
+
+    content = response.content
+    new_state = {
+        'url': url,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'content_hash': hashlib.sha256(content).hexdigest(),
+    }
+    if new_state['content_hash'] == state.get('content_hash'):
+        return None, new_state, len(content)
+    return content, new_state, len(content)
@@ -1,126 +1,261 @@
 #!/usr/bin/env python3
 import os
+import re
 import json
 import time
+import queue
+import calendar
 import feedparser
-import requests
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from uuid import uuid4
 import database  # Import the new DB module
+import dedup
+import http_client
 
 # Configuration
-RSS_FEEDS = [
-    {
-        "name": "TechCrunch AI",
-        "url": "https://techcrunch.com/category/artificial-intelligence/feed/"
-    },
-    {
-        "name": "VentureBeat AI",
-        "url": "https://venturebeat.com/category/ai/feed/"
-    },
-    {
-        "name": "MIT Tech Review AI",
-        "url": "https://www.technologyreview.com/topic/artificial-intelligence/feed"
-    },
-    {
-        "name": "Wired AI",
-        "url": "https://www.wired.com/feed/tag/ai/latest/rss"
-    },
-    {
-        "name": "Guardian AI",
-        "url": "https://www.theguardian.com/technology/artificialintelligenceai/rss"
-    },
-    {
-        "name": "The Verge - AI",
-        "url": "https://www.theverge.com/rss/ai-artificial-intelligence/index.xml"
-    },
-    {
-        "name": "ArXiv CS.AI",
-        "url": "http://export.arxiv.org/api/query?search_query=cat:cs.AI&sortBy=lastUpdatedDate&sortOrder=descending&max_results=10",
-        "limit": 5  # Only take top 5 papers per run
-    }
-]
+SOURCES_PATH = os.getenv("INGEST_SOURCES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "sources.json"))
+
+def load_sources(path=SOURCES_PATH):
+    """Read the source registry; per-source settings override its defaults."""
+    with open(path) as f:
+        registry = json.load(f)
+    defaults = registry.get('defaults', {})
+    feeds = [{**defaults, **config} for config in registry.get('rss', [])]
+    subs = [{**defaults, **config} for config in registry.get('reddit', [])]
+    return feeds, subs
+
+RSS_FEEDS, REDDIT_SUBS = load_sources()
+
+REDDIT_URL = "https://www.reddit.com/r/{sub}/{filter}.json?limit=25"
 
-REDDIT_SUBS = [
-    {"name": "r/MachineLearning", "sub": "MachineLearning", "filter": "hot"},
-    {"name": "r/artificial", "sub": "artificial", "filter": "hot"},
-    {"name": "r/OpenAI", "sub": "OpenAI", "filter": "hot"},
-    {"name": "r/LocalLLaMA", "sub": "LocalLLaMA", "filter": "hot"},
-]
+FETCH_WORKERS = int(os.getenv("INGEST_FETCH_WORKERS", "8"))  # per-host spacing is in http_client
+BUFFER_SIZE = int(os.getenv("INGEST_BUFFER_SIZE", "100"))  # entries in flight between fetchers and writer
+WRITE_BATCH = 50  # records per insert transaction
 
 TIME_FILTER_DAYS = 7  # Only news from last 7 days
 
+# Adaptive polling: aim for a few new entries per poll, within each source's
+# min/max interval. POLL_SLACK absorbs cron jitter so an hourly source
+# scheduled for 10:00:05 is still polled by the 10:00 run.
+TARGET_NEW_PER_POLL = 3
+RATE_SMOOTHING = 0.5  # weight of the latest observation in publish_rate
+MISS_BACKOFF = 1.5    # interval growth after a poll with nothing new
+POLL_SLACK = 300
+
+# Yield caps: a source may enqueue MAX_PER_CYCLE items per cycle scaled by the
+# share of its items that passed relevance over YIELD_WINDOW_DAYS. The rate
+# is smoothed towards 1/2 so new sources start at half the budget.
+YIELD_WINDOW_DAYS = 14
+MAX_PER_CYCLE = 20
+MIN_PER_CYCLE = 2
+
+KNOWN_URL_DAYS = TIME_FILTER_DAYS + 1  # Known-URL window, with a day of slack for late dates
+SEEN_GUIDS_MAX = 500  # GUIDs remembered per source; feeds list far fewer
+
 def ensure_output_dir():
     # Deprecated: DB handles storage
     pass
 
-def is_recent(date_str, days=TIME_FILTER_DAYS):
-    """Check if date is within last N days"""
-    try:
-        if isinstance(date_str, str):
-            # Parse various date formats
-            from dateutil import parser
-            pub_date = parser.parse(date_str)
-        else:
-            pub_date = datetime.now()
-        
-        cutoff = datetime.now() - timedelta(days=days)
-        return pub_date.replace(tzinfo=None) >= cutoff.replace(tzinfo=None)
-    except:
-        # If can't parse, assume it's recent
-        return True
+def entry_timestamp(entry):
+    """UTC epoch for a feed entry, from feedparser's pre-parsed struct when present."""
+    for key in ('published_parsed', 'updated_parsed'):
+        if entry.get(key):
+            return calendar.timegm(entry[key])
+    return database.parse_published(entry.get('published'))
+
+def select_new(items, state, guid_of, timestamp_of, days=TIME_FILTER_DAYS, chronological=False):
+    """
+    Keep items not seen in the source's last listing and not older than the
+    last N days. Undated items count as recent, as before. Only a source
+    configured as chronological (new items always carry newer dates) also
+    drops items older than its watermark: ranked listings such as Reddit
+    'hot' and feeds that re-date or reorder entries surface older items
+    later, and the known-URL set already drops repeats.
+    Returns ([(item, published_ts)], watermark_fields) where watermark_fields
+    are the source_state updates to store once the items are saved.
+    """
+    state = state or {}
+    seen = set(json.loads(state.get('seen_guids') or '[]'))
+    watermark = state.get('watermark_ts') or 0
+    cutoff = int(time.time()) - days * 86400
+    if chronological:
+        cutoff = max(cutoff, watermark)
+
+    selected = []
+    guids = []
+    for item in items:
+        guid = guid_of(item)
+        guids.append(guid)
+        if guid in seen:
+            continue
+        ts = timestamp_of(item)
+        if ts is None or ts >= cutoff:
+            selected.append((item, ts))
 
-def fetch_feed(feed_config):
+    newest = max((ts for _, ts in selected if ts is not None), default=watermark)
+    return selected, {
+        'watermark_ts': max(watermark, newest) or None,
+        'seen_guids': json.dumps(guids[:SEEN_GUIDS_MAX]),
+    }
+
+def fetch_feed(feed_config, state=None):
+    """
+    Fetch one RSS/Atom feed, revalidating with the source's stored state.
+    Returns (entries, fetch) where fetch holds the new state, bytes downloaded
+    and whether the feed was unchanged (nothing parsed).
+    """
     print(f"Fetching {feed_config['name']}...")
+    fetch = {'state': state, 'bytes': 0, 'unchanged': False}
     try:
-        feed = feedparser.parse(feed_config['url'])
+        content, fetch['state'], fetch['bytes'] = http_client.conditional_get(feed_config['url'], state)
+        if content is None:
+            fetch['unchanged'] = True
+            print(f"  {feed_config['name']}: unchanged since last fetch")
+            return [], fetch
+
+        feed = feedparser.parse(content)
         if feed.bozo:
              print(f"Warning: Issue parsing {feed_config['name']}: {feed.bozo_exception}")
         
-        # Filter for recent entries only
-        recent_entries = [e for e in feed.entries if is_recent(e.get('published', ''))]
-        print(f"  Found {len(recent_entries)} recent entries (last {TIME_FILTER_DAYS} days)")
-        return recent_entries
+        # Only entries not in the last listing are normalized and saved
+        selected, watermark = select_new(
+            feed.entries, state, lambda e: e.get('id') or e.get('link'), entry_timestamp,
+            chronological=feed_config.get('chronological', False)
+        )
+        fetch['state'] = {**fetch['state'], **watermark}
+        new_entries = []
+        for entry, ts in selected:
+            entry['published_ts'] = ts
+            new_entries.append(entry)
+        print(f"  {feed_config['name']}: found {len(new_entries)} new entries of {len(feed.entries)} listed")
+
+        # Apply limit if it exists (e.g., for ArXiv)
+        if "limit" in feed_config:
+            print(f"  Filtering to top {feed_config['limit']} entries (Quality Control)")
+            new_entries = new_entries[:feed_config['limit']]
+        return new_entries, fetch
     except Exception as e:
         print(f"Error fetching {feed_config['name']}: {e}")
-        return []
+        return [], {**fetch, 'state': state, 'error': True}
 
-def fetch_reddit(sub_config):
-    """Fetch Reddit posts using JSON API (no auth needed for public posts)"""
+def fetch_reddit(sub_config, state=None):
+    """Fetch Reddit posts using JSON API (no auth needed for public posts). Returns (posts, fetch) like fetch_feed."""
     print(f"Fetching {sub_config['name']}...")
+    fetch = {'state': state, 'bytes': 0, 'unchanged': False}
     try:
-        url = f"https://www.reddit.com/r/{sub_config['sub']}/{sub_config['filter']}.json?limit=25"
-        headers = {'User-Agent': 'LLMLens/1.0'}
+        url = REDDIT_URL.format(sub=sub_config['sub'], filter=sub_config['filter'])
+        content, fetch['state'], fetch['bytes'] = http_client.conditional_get(url, state)
+        if content is None:
+            fetch['unchanged'] = True
+            print(f"  {sub_config['name']}: unchanged since last fetch")
+            return [], fetch
+
+        children = [post['data'] for post in json.loads(content)['data']['children']]
+        selected, watermark = select_new(
+            children, state, lambda p: p.get('name') or p['permalink'], lambda p: int(p['created_utc']),
+            chronological=sub_config.get('chronological', False)
+        )
+        fetch['state'] = {**fetch['state'], **watermark}
+        posts = []
+        
+        for p, ts in selected:
+            posts.append({
+                'title': p['title'],
+                'link': f"https://reddit.com{p['permalink']}",
+                'published': datetime.fromtimestamp(ts).isoformat(),
+                'published_ts': ts,
+                'summary': p.get('selftext', '')[:2000] if p.get('selftext') else p['title'],
+                'score': p['score'],
+                'comments': p['num_comments'],
+                'flair': p.get('link_flair_text'),
+            })
         
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
-            posts = []
-            
-            for post in data['data']['children']:
-                p = post['data']
-                # Filter for recent and AI-related
-                created = datetime.fromtimestamp(p['created_utc'])
-                if is_recent(created.isoformat()):
-                    posts.append({
-                        'title': p['title'],
-                        'link': f"https://reddit.com{p['permalink']}",
-                        'published': created.isoformat(),
-                        'summary': p.get('selftext', '')[:2000] if p.get('selftext') else p['title'],
-                        'score': p['score'],
-                        'comments': p['num_comments']
-                    })
-            
-            print(f"  Found {len(posts)} recent posts")
-            return posts, sub_config['name']
-        else:
-            print(f"  Failed: HTTP {response.status_code}")
-            return [], sub_config['name']
+        print(f"  {sub_config['name']}: found {len(posts)} new posts of {len(children)} listed")
+        return posts, fetch
     except Exception as e:
         print(f"Error fetching {sub_config['name']}: {e}")
-        return [], sub_config['name']
+        return [], {**fetch, 'state': state, 'error': True}
+
+def is_due(state, now=None):
+    """True if a source has never been polled or its next_poll_at has come."""
+    now = time.time() if now is None else now
+    return not state or not state.get('next_poll_at') or state['next_poll_at'] <= now + POLL_SLACK
+
+def schedule_next_poll(config, state, new_entries, now=None):
+    """
+    Source_state fields for the next poll. publish_rate (entries/hour) is
+    smoothed over polls; the interval is the time expected to collect
+    TARGET_NEW_PER_POLL entries at that rate, and a poll with nothing new
+    stretches it by MISS_BACKOFF. Clamped to the source's min/max interval.
+    """
+    now = time.time() if now is None else now
+    state = state or {}
+    min_interval = config.get('min_interval_minutes', 60) * 60
+    max_interval = config.get('max_interval_minutes', 720) * 60
+    interval = state.get('poll_interval') or min_interval
+    last_polled = state.get('last_polled_at')
+
+    rate = state.get('publish_rate')
+    if last_polled:
+        observed = new_entries / max((now - last_polled) / 3600, 1 / 60)
+        rate = observed if rate is None else RATE_SMOOTHING * observed + (1 - RATE_SMOOTHING) * rate
+
+    if new_entries and rate:
+        interval = TARGET_NEW_PER_POLL / rate * 3600
+    elif not new_entries:
+        interval *= MISS_BACKOFF
+    interval = min(max(interval, min_interval), max_interval)
+    return {
+        'last_polled_at': now,
+        'poll_interval': interval,
+        'next_poll_at': now + interval,
+        'publish_rate': rate,
+    }
+
+def _fetch_worker(fetch_fn, config, state, out):
+    """Fetch one source and push its entries, then a done marker, onto `out`."""
+    fetch = {'state': state, 'bytes': 0, 'unchanged': False}
+    try:
+        entries, fetch = fetch_fn(config, state)
+        if not fetch.get('error'):
+            fetch['state'] = {**(fetch['state'] or {}), **schedule_next_poll(config, state, len(entries))}
+        for entry in entries:
+            out.put(('entry', config['name'], entry))  # blocks while the writer is behind
+    finally:
+        out.put(('done', config['name'], fetch))
 
-def save_entry(entry, source_name):
+def fetch_sources(feeds=None, subs=None, states=None, workers=FETCH_WORKERS, buffer_size=BUFFER_SIZE):
+    """
+    Fetch all feeds and subreddits concurrently. Yields ('entry', source, entry)
+    as entries arrive and ('done', source, fetch) once a source is finished.
+    Workers hand entries over through a bounded queue, so downloads are held
+    back rather than buffered when the consumer falls behind. Only fetching
+    runs in worker threads; the consumer does the database writes.
+    """
+    feeds = RSS_FEEDS if feeds is None else feeds
+    subs = REDDIT_SUBS if subs is None else subs
+    states = states or {}
+    jobs = [(fetch_feed, config) for config in feeds] + [(fetch_reddit, config) for config in subs]
+    out = queue.Queue(maxsize=buffer_size)
+    remaining = len(jobs)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for fetch_fn, config in jobs:
+            pool.submit(_fetch_worker, fetch_fn, config, states.get(config['name']), out)
+        try:
+            while remaining:
+                event = out.get()
+                if event[0] == 'done':
+                    remaining -= 1
+                yield event
+        finally:
+            # Consumer stopped early: drain so blocked workers can finish
+            while remaining:
+                if out.get()[0] == 'done':
+                    remaining -= 1
+
+def build_article(entry, source_name):
+    """Turn a feed entry or Reddit post into a database insert record."""
     data = {
         "id": str(uuid4()),
         "title": entry.get('title', 'No Title'),
@@ -130,49 +265,249 @@ def save_entry(entry, source_name):
         "source": source_name,
         "fetched_at": datetime.now().isoformat()
     }
+    # Canonical UTC epoch used for feed ordering (raw 'published' strings don't sort)
+    data['published_ts'] = entry.get('published_ts') or database.parse_published(data['published'])
+    data['canonical_url'], data['simhash'] = dedup.fingerprint(data['link'], data['title'], data['summary'])
+    # Feed categories / Reddit flair, for routing only (not stored)
+    data['tags'] = [tag.get('term', '') for tag in entry.get('tags', [])] if 'tags' in entry else []
+    if entry.get('flair'):
+        data['tags'].append(entry['flair'])
     
     # Add Reddit-specific metadata if present
     if 'score' in entry:
         data['reddit_score'] = entry['score']
         data['reddit_comments'] = entry.get('comments', 0)
     
-    # Save to database
-    success = database.insert_article(data)
-    return success
+    return data
+
+def normalize(events):
+    """Pipeline stage: feed entries / Reddit posts -> database insert records."""
+    for kind, source, payload in events:
+        if kind == 'entry':
+            payload = build_article(payload, source)
+        yield kind, source, payload
+
+def drop_duplicates(events, known_urls, stories, stats):
+    """
+    Pipeline stage: drop records whose raw or canonical URL is already known.
+    Near-duplicates of a story already in `stories` are marked 'duplicate'
+    and linked to it, so they are stored but never reach the LLM stages.
+    New stories are indexed later, by register_stories.
+    """
+    for kind, source, payload in events:
+        counts = stats.setdefault(source, {'fetched': 0, 'new': 0, 'dup': 0, 'skipped': 0, 'capped': 0,
+                                           'known': 0, 'bytes': 0})
+        if kind != 'entry':
+            yield kind, source, payload
+            continue
+
+        counts['fetched'] += 1
+        if payload['link'] in known_urls or payload['canonical_url'] in known_urls:
+            counts['known'] += 1
+            continue
+        known_urls.update((payload['link'], payload['canonical_url']))
+
+        story_id = stories.find(dedup.from_signed64(payload['simhash']), payload['title'])
+        if story_id:
+            payload['status'] = 'duplicate'
+            payload['story_id'] = story_id
+        yield kind, source, payload
+
+# Routing rules: first match wins. Actions set the status an item is stored
+# with, so skipped items never reach a paid LLM stage.
+ROUTE_ACTIONS = {'skip': 'ignored', 'fast_track': 'filtered', 'default': 'ingested'}
+
+def load_routes(path=SOURCES_PATH):
+    """
+    Read the registry's "routes" table. A rule matches on any of: source,
+    source_prefix, title_pattern (regex), category (feed tag / Reddit flair).
+    """
+    with open(path) as f:
+        routes = json.load(f).get('routes', [])
+    for rule in routes:
+        if rule.get('action') not in ROUTE_ACTIONS:
+            raise ValueError(f"Route {rule.get('name')}: unknown action {rule.get('action')!r}")
+        if 'title_pattern' in rule:
+            rule['title_re'] = re.compile(rule['title_pattern'])
+    return routes
+
+ROUTES = load_routes()
+
+def match_route(record, routes):
+    """The first routing rule matching an insert record, or None."""
+    tags = {tag.lower() for tag in record.get('tags', [])}
+    for rule in routes:
+        if 'source' in rule and record['source'] != rule['source']:
+            continue
+        if 'source_prefix' in rule and not record['source'].startswith(rule['source_prefix']):
+            continue
+        if 'title_re' in rule and not rule['title_re'].search(record['title'] or ''):
+            continue
+        if 'category' in rule and rule['category'].lower() not in tags:
+            continue
+        return rule
+    return None
+
+def route(events, routes):
+    """
+    Pipeline stage: apply the first matching routing rule. 'skip' stores the
+    item as ignored and 'fast_track' as filtered, each with a routing analysis
+    (no relevance_score, so it's never taken for an LLM label).
+    """
+    for kind, source, payload in events:
+        rule = match_route(payload, routes) if kind == 'entry' and payload.get('status') is None else None
+        if rule and rule['action'] != 'default':
+            payload['status'] = ROUTE_ACTIONS[rule['action']]
+            payload['analysis'] = {
+                'category': rule.get('analysis_category', 'Other'),
+                'infographic_worthy': rule['action'] == 'fast_track',
+                'route': rule.get('name'),
+                'reasoning': f"Routing rule {rule.get('name')}: {rule.get('reason', rule['action'])}",
+            }
+        yield kind, source, payload
+
+def yield_rate(state):
+    state = state or {}
+    return ((state.get('yield_passed') or 0) + 1) / ((state.get('yield_decided') or 0) + 2)
+
+def enqueue_cap(state):
+    """Items a source may send into the LLM pipeline this cycle."""
+    return max(MIN_PER_CYCLE, round(MAX_PER_CYCLE * yield_rate(state)))
+
+def apply_yield_caps(events, caps):
+    """
+    Pipeline stage: once a source has enqueued its cap of items this cycle,
+    the rest are stored as 'capped' (known, never analyzed). Duplicates
+    don't count towards the cap.
+    """
+    enqueued = {}
+    for kind, source, payload in events:
+        if kind == 'entry' and payload.get('status') is None:
+            enqueued[source] = enqueued.get(source, 0) + 1
+            if enqueued[source] > caps.get(source, MAX_PER_CYCLE):
+                payload['status'] = 'capped'
+        yield kind, source, payload
+
+def register_stories(events, stories):
+    """
+    Pipeline stage: index records as canonical stories for near-duplicate
+    lookups. Runs after the yield cap: a capped record is never analyzed, so
+    a later copy from another source must enter the pipeline itself rather
+    than be stored as its duplicate.
+    """
+    for kind, source, payload in events:
+        if kind == 'entry' and payload.get('status') not in ('duplicate', 'capped'):
+            stories.add(payload['id'], dedup.from_signed64(payload['simhash']), payload['title'])
+        yield kind, source, payload
 
-def main():
+def write_batches(events, states, stats, batch_size=WRITE_BATCH):
+    """
+    Pipeline stage (sink): insert records WRITE_BATCH at a time. When a source
+    is done, pending records are flushed before its source_state is saved, so
+    a failed write re-fetches next run. Returns the number of new articles.
+    """
+    batch = []
+    failed = set()
+
+    def flush():
+        if not batch:
+            return
+        inserted, skipped = database.insert_articles_bulk(batch)
+        skipped_ids = {id(record) for record in skipped}
+        error = not inserted and len(skipped) < len(batch)
+        for record in batch:
+            counts = stats[record['source']]
+            if error:
+                failed.add(record['source'])
+            elif id(record) in skipped_ids:
+                counts['known'] += 1
+            else:
+                counts[{'duplicate': 'dup', 'capped': 'capped', 'ignored': 'skipped'}.get(record.get('status'), 'new')] += 1
+        batch.clear()
+
+    for kind, source, payload in events:
+        if kind == 'entry':
+            batch.append(payload)
+            if len(batch) >= batch_size:
+                flush()
+            continue
+
+        flush()
+        counts = stats[source]
+        counts['bytes'] = payload['bytes']
+        counts['unchanged'] = payload['unchanged']
+        if not payload['unchanged']:
+            print(f"  {source}: saved {counts['new']} new, {counts['dup']} duplicate stories, "
+                  f"{counts['skipped']} routed to skip, {counts['capped']} over yield cap, "
+                  f"{counts['known']} already known")
+
+        old_state = states.get(source) or {}
+        if source not in failed and payload['state'] and any(
+                old_state.get(k) != v for k, v in payload['state'].items()):
+            database.save_source_state(source, payload['state'])
+    flush()
+    return sum(counts['new'] for counts in stats.values())
+
+def print_stats(stats):
+    print(f"\n{'source':<22}{'KB':>8}{'fetched':>9}{'new':>6}{'dup':>6}{'skip':>6}{'cap':>6}{'known':>7}")
+    for source, counts in stats.items():
+        if counts.get('unchanged'):
+            print(f"{source:<22}{counts['bytes'] / 1024:>8.1f}{'unchanged':>40}")
+            continue
+        print(f"{source:<22}{counts['bytes'] / 1024:>8.1f}{counts['fetched']:>9}{counts['new']:>6}"
+              f"{counts['dup']:>6}{counts['skipped']:>6}{counts['capped']:>6}{counts['known']:>7}")
+    downloaded = sum(counts['bytes'] for counts in stats.values())
+    unchanged = sum(1 for counts in stats.values() if counts.get('unchanged'))
+    print(f"Downloaded {downloaded / 1024:.1f} KB; {unchanged} of {len(stats)} sources unchanged (not parsed)")
+
+def main(force_all=False):
     database.init_db()  # Ensure DB is ready
     print(f"Starting News Ingestion (last {TIME_FILTER_DAYS} days)...")
     print("=" * 60)
     
-    total_saved = 0
-    
-    # Fetch RSS feeds
-    print("\n[RSS FEEDS]:")
-    for feed_config in RSS_FEEDS:
-        entries = fetch_feed(feed_config)
-        
-        # Apply limit if it exists (e.g., for ArXiv)
-        if "limit" in feed_config:
-            print(f"  Filtering to top {feed_config['limit']} entries (Quality Control)")
-            entries = entries[:feed_config['limit']]
+    stats = {}
+    database.backfill_fingerprints(dedup.fingerprint, KNOWN_URL_DAYS)
+    known_urls = database.get_known_urls(KNOWN_URL_DAYS)
+    stories = dedup.StoryIndex()
+    for article_id, fp, title in database.get_story_fingerprints(KNOWN_URL_DAYS):
+        stories.add(article_id, dedup.from_signed64(fp), title)
+    database.refresh_source_yield(YIELD_WINDOW_DAYS)
+    states = database.get_source_states()
+    print(f"Loaded {len(known_urls)} known URLs from the last {KNOWN_URL_DAYS} days")
 
-        for entry in entries:
-            if save_entry(entry, feed_config['name']):
-                total_saved += 1
-        time.sleep(1)  # Be polite
+    caps = {}
+    print(f"\n{'source':<22}{'yield':>7}{'decided':>9}{'cap':>5}   (last {YIELD_WINDOW_DAYS} days)")
+    for config in RSS_FEEDS + REDDIT_SUBS:
+        state = states.get(config['name']) or {}
+        caps[config['name']] = enqueue_cap(state)
+        print(f"{config['name']:<22}{yield_rate(state):>7.0%}{state.get('yield_decided') or 0:>9}{caps[config['name']]:>5}")
     
-    # Fetch Reddit
-    print("\n[REDDIT]:")
-    for sub_config in REDDIT_SUBS:
-        posts, source = fetch_reddit(sub_config)
-        for post in posts:
-            if save_entry(post, source):
-                total_saved += 1
-        time.sleep(2)  # Reddit rate limit politeness
+    # fetch -> parse -> recency (in fetch workers) -> normalize -> dedup -> route -> yield cap
+    # -> story index -> batched write.
+    # Entries stream into the database while other sources are still downloading.
+    if force_all:
+        feeds, subs = RSS_FEEDS, REDDIT_SUBS
+    else:
+        feeds = [c for c in RSS_FEEDS if is_due(states.get(c['name']))]
+        subs = [c for c in REDDIT_SUBS if is_due(states.get(c['name']))]
+    not_due = len(RSS_FEEDS) + len(REDDIT_SUBS) - len(feeds) - len(subs)
+    print(f"\n[FETCHING {len(feeds)} FEEDS + {len(subs)} SUBREDDITS, {not_due} not due]:")
+    events = fetch_sources(feeds, subs, states=states)
+    events = drop_duplicates(normalize(events), known_urls, stories, stats)
+    events = apply_yield_caps(route(events, ROUTES), caps)
+    events = register_stories(events, stories)
+    total_saved = write_batches(events, states, stats)
     
+    print_stats(stats)
+    http_client.print_metrics()
     print("=" * 60)
     print(f"[SUCCESS] Ingestion complete. Saved {total_saved} new articles to database.")
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="Fetch news from the source registry")
+    parser.add_argument("--all", action="store_true", help="Poll every source, ignoring next_poll_at")
+    args = parser.parse_args()
+
+    with database.session():
+        main(force_all=args.all)
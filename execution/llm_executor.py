@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Lens LLM Executor
+Runs Gemini calls with bounded concurrency under per-model requests-per-minute
+and tokens-per-minute buckets, replacing the fixed sleeps between calls.
+
+Stages hand their per-article work to run() and write results (or record
+the item's error) as they are yielded, on the calling thread (database
+sessions are per thread). Every
+generate_content() call, including retries and fallbacks, is admitted by
+its model's buckets.
+"""
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# (requests/min, tokens/min) per model; override with
+# LLM_LIMITS='{"gemini-3-pro-preview": [50, 2000000]}'
+MODEL_LIMITS = {
+    'gemini-3-pro-preview': (25, 1000000),
+    'gemini-3-flash-preview': (100, 1000000),
+    'gemini-3-pro-image-preview': (10, 500000),
+}
+MODEL_LIMITS.update({model: tuple(limits) for model, limits in json.loads(os.getenv("LLM_LIMITS", "{}")).items()})
+DEFAULT_LIMITS = (15, 250000)
+CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 258         # Gemini's per-image input cost
+OUTPUT_TOKEN_ESTIMATE = 1000
+
+
+class TokenBucket:
+    """
+    Refills `per_minute` units per minute up to a minute's worth. acquire()
+    reserves units under the lock (the balance may go negative) and sleeps
+    outside it, so callers are admitted in arrival order at the refill rate.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount=1):
+        """Block until `amount` units are available. Returns seconds waited."""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def adjust(self, delta):
+        """Charge (positive) or refund (negative) units after the fact."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - delta)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _limiter(model):
+    """(requests bucket, tokens bucket) for a model, created on first use."""
+    with _limiters_lock:
+        if model not in _limiters:
+            rpm, tpm = MODEL_LIMITS.get(model, DEFAULT_LIMITS)
+            _limiters[model] = (TokenBucket(rpm), TokenBucket(tpm))
+        return _limiters[model]
+
+
+def estimate_tokens(contents):
+    """Rough input + output tokens for a generate_content call's contents."""
+    parts = contents if isinstance(contents, (list, tuple)) else [contents]
+    tokens = 0
+    for part in parts:
+        tokens += len(part) // CHARS_PER_TOKEN if isinstance(part, str) else IMAGE_TOKENS
+    return tokens + OUTPUT_TOKEN_ESTIMATE
+
+
+def generate_content(client, model, contents, config=None):
+    """client.models.generate_content, admitted by the model's RPM and TPM buckets."""
+    requests_bucket, tokens_bucket = _limiter(model)
+    estimate = estimate_tokens(contents)
+    requests_bucket.acquire()
+    tokens_bucket.acquire(estimate)
+    response = client.models.generate_content(model=model, contents=contents, config=config)
+    meta = getattr(response, 'usage_metadata', None)
+    if meta and meta.total_token_count:
+        tokens_bucket.adjust(meta.total_token_count - estimate)
+    return response
+
+
+def run(fn, items, concurrency=None):
+    """
+    Call fn(item) for every item on up to `concurrency` threads (LLM_CONCURRENCY
+    by default). Yields (item, result, error) in completion order: error is
+    the exception fn raised (result None), else None.
+    """
+    items = list(items)
+    if not items:
+        return
+    with ThreadPoolExecutor(max_workers=concurrency or CONCURRENCY) as pool:
+        futures = {pool.submit(fn, item): item for item in items}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
@@ -6,7 +6,9 @@ The autonomous orchestrator for ingestion, distillation, verification, and criti
 """
 import os
 import sys
+import json
 import time
+import tempfile
 import subprocess
 from datetime import datetime
 
@@ -47,6 +49,20 @@ def run_agent(script_name):
         if e.stderr: print(f"   STDERR: {e.stderr[-300:]}")
         return False
 
+def report_db_stats(stats_path):
+    """Sum the per-stage database counters written by database.py for this cycle."""
+    if not os.path.exists(stats_path):
+        return
+    totals = {'connects': 0, 'syncs': 0, 'sync_seconds': 0.0, 'replica_growth_bytes': 0}
+    with open(stats_path) as f:
+        for line in f:
+            record = json.loads(line)
+            for key in totals:
+                totals[key] += record.get(key, 0)
+    os.remove(stats_path)
+    log(f"DB: {totals['connects']} connects, {totals['syncs']} replica syncs "
+        f"({totals['sync_seconds']:.1f}s; replica grew {totals['replica_growth_bytes'] / 1024:.0f} KB)")
+
 import argparse
 
 def main():
@@ -64,6 +80,8 @@ def main():
     while True:
         cycle_start = time.time()
         log("--- STARTING NEW AGENTIC CYCLE ---")
+        stats_path = os.path.join(tempfile.gettempdir(), f"llm_lens_db_stats_{os.getpid()}.jsonl")
+        os.environ["DB_STATS_PATH"] = stats_path
         
         # 1. Ingestion: Fetch latest AI news from RSS/Reddit
         run_agent("ingest_news.py")
@@ -80,12 +98,13 @@ def main():
         # 5. Visual Generation: Create HUD infographics using Nano Banana Pro
         run_agent("generate_ai_visuals.py")
 
-        # 5.5. Cloud Sync (NEW): Upload to Cloudinary
+        # 6. Cloud Sync: Upload new visuals to Cloudinary before this runner's disk goes away
         run_agent("upload_visuals.py")
-        
-        # 6. Self-Critique Agent (ACTIVATED): Review visuals via Gemini 3 Vision
+
+        # 7. Self-Critique Agent (ACTIVATED): Review uploaded visuals via Gemini 3 Vision
         run_agent("self_critique.py")
         
+        report_db_stats(stats_path)
         cycle_duration = time.time() - cycle_start
         log(f"Agentic Cycle completed in {cycle_duration/60:.2f} minutes")
         
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM Lens Local Relevance Pre-filter
+Scores title + summary against a weighted AI lexicon before any Gemini call.
+Items that only match noise terms (memes, megathreads, giveaways) are
+ignored and clear positives fast-tracked; everything else, including any
+item with an AI term or no lexicon hit at all, goes to the LLM relevance
+check. Off by default (RELEVANCE_PREFILTER=1 in analyze_relevance) until
+the thresholds are tuned with --evaluate on production labels.
+
+Scoring is BM25 term saturation and length normalization (as in the BM25
+class of the ui-ux-pro-max skill) with fixed lexicon weights in place of
+corpus IDF, so scores are comparable across runs and thresholds stay put.
+
+    python execution/prefilter.py --evaluate   # precision/recall vs past Gemini labels
+"""
+import re
+import sys
+import argparse
+from pathlib import Path
+from collections import Counter
+
+# Term weights, grouped by the category analyze_relevance would assign.
+# Keys are single tokens or two-token phrases.
+LEXICON = {
+    'Model Release': {
+        'llm': 2.0, 'llms': 2.0, 'gpt': 2.0, 'gemini': 2.0, 'claude': 2.0, 'llama': 2.0,
+        'mistral': 1.5, 'deepseek': 2.0, 'qwen': 2.0, 'language model': 2.0, 'open weights': 1.5,
+        'multimodal': 1.5, 'model': 0.8, 'models': 0.8, 'weights': 0.8, 'parameters': 0.8,
+        'reasoning': 1.0, 'benchmark': 1.0, 'benchmarks': 1.0, 'fine tuning': 1.0,
+        'agentic': 1.5, 'agent': 1.0, 'agents': 1.0, 'release': 0.5, 'launches': 0.5,
+    },
+    'Chip Advancement': {
+        'nvidia': 2.0, 'gpu': 1.5, 'gpus': 1.5, 'tpu': 1.5, 'chip': 1.2, 'chips': 1.2,
+        'semiconductor': 1.2, 'tsmc': 1.2, 'h100': 2.0, 'b200': 2.0, 'blackwell': 2.0,
+        'inference': 1.0, 'data center': 1.0, 'datacenter': 1.0, 'amd': 0.8,
+    },
+    'Industry Shift': {
+        'ai': 1.0, 'artificial intelligence': 1.5, 'generative ai': 1.5, 'machine learning': 1.5,
+        'openai': 2.0, 'anthropic': 2.0, 'deepmind': 2.0, 'chatgpt': 2.0, 'hugging face': 1.5,
+        'huggingface': 1.5, 'copilot': 1.2, 'xai': 1.0, 'ai act': 1.2, 'funding': 0.6,
+        'acquisition': 0.6, 'regulation': 0.6, 'copyright': 0.4,
+    },
+    'Research': {
+        'arxiv': 1.0, 'paper': 0.6, 'dataset': 0.8, 'training': 0.6, 'transformer': 1.5,
+        'transformers': 1.5, 'diffusion': 1.2, 'neural': 1.0, 'reinforcement learning': 1.2,
+        'rlhf': 1.5, 'alignment': 0.8,
+    },
+    'Application': {
+        'chatbot': 1.2, 'assistant': 0.6, 'robot': 0.8, 'robotics': 1.0, 'autonomous': 0.6,
+        'coding': 0.6, 'api': 0.5,
+    },
+    # Negative weights only for unambiguous noise: topical words like 'iphone'
+    # or 'hiring' also appear in real AI stories ("Microsoft is hiring AI researchers")
+    'Other': {
+        'meme': -3.0, 'memes': -3.0, 'shitpost': -3.0, 'megathread': -3.0,
+        'weekly thread': -3.0, 'discussion thread': -2.0, 'giveaway': -3.0, 'black friday': -3.0,
+    },
+}
+WEIGHTS = {term: (weight, category) for category, terms in LEXICON.items() for term, weight in terms.items()}
+
+K1 = 1.5
+B = 0.75
+AVG_DOC_TOKENS = 60   # typical title x2 + summary length, in place of corpus avgdl
+TITLE_REPEAT = 2      # title terms count twice
+
+# Decision thresholds (tune with --evaluate). Only 'Other' terms weigh
+# negative; an item is rejected only below REJECT_BELOW *and* with no AI
+# term at all, so a noise word never outvotes an AI signal. A score of 0
+# is no evidence either way and goes to the LLM. Keep REJECT_BELOW <= 0.
+REJECT_BELOW = 0.0    # noise terms only: ignore without an LLM call
+ACCEPT_ABOVE = 9.0    # several strong AI signals: fast-track to 'filtered'
+
+
+def tokenize(text):
+    """Lowercase word tokens plus adjacent-pair phrases; keeps 2-letter tokens like 'ai'."""
+    text = re.sub(r'<[^>]+>', ' ', str(text or '')).lower()
+    words = [w for w in re.sub(r'[^\w\s]', ' ', text).split() if len(w) > 1]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def score(title, summary=''):
+    """(score, category): BM25-weighted lexicon score and the best-matching category."""
+    tokens = tokenize(title) * TITLE_REPEAT + tokenize(summary)
+    doc_len = sum(1 for t in tokens if ' ' not in t)
+    norm = K1 * (1 - B + B * doc_len / AVG_DOC_TOKENS)
+    by_category = Counter()
+    for term, tf in Counter(tokens).items():
+        if term in WEIGHTS:
+            weight, category = WEIGHTS[term]
+            by_category[category] += weight * tf * (K1 + 1) / (tf + norm)
+    total = sum(by_category.values())
+    positive = {c: s for c, s in by_category.items() if s > 0 and c != 'Other'}
+    return total, max(positive, key=positive.get) if positive else 'Other'
+
+
+def classify(article, reject_below=REJECT_BELOW, accept_above=ACCEPT_ABOVE):
+    """
+    ('ignored' | 'filtered' | None, analysis). None means ambiguous: ask the
+    LLM. The analysis mirrors analyze_relevance's shape so later stages and
+    the feed's category badge work unchanged; it has no relevance_score, so
+    prefilter decisions are never mistaken for LLM labels.
+    """
+    s, category = score(article.get('title'), article.get('summary'))
+    if s < reject_below and category == 'Other':
+        return 'ignored', {
+            'category': 'Other', 'infographic_worthy': False, 'prefilter_score': round(s, 2),
+            'reasoning': f"Local prefilter: score {s:.1f} below {reject_below}",
+        }
+    if s >= accept_above:
+        return 'filtered', {
+            'category': category, 'infographic_worthy': True, 'prefilter_score': round(s, 2),
+            'reasoning': f"Local prefilter: score {s:.1f} at or above {accept_above}",
+        }
+    return None, None
+
+
+def load_labelled():
+    """(score, category, relevant) for every article Gemini has judged, by analyze_relevance's rule."""
+    sys.path.append(str(Path(__file__).parent))
+    import database
+
+    labelled = []
+    with database.session():
+        database.init_db()
+        for status in database.PASSED_STATUSES + ('ignored',):
+            for article in database.iter_articles_by_status(status, columns=['title', 'summary', 'analysis_json']):
+                analysis = article.analysis or {}
+                if 'relevance_score' not in analysis:
+                    continue  # no LLM label (prefilter or routing decision)
+                relevant = (analysis.get('relevance_score') or 0) >= 3 or bool(analysis.get('infographic_worthy'))
+                labelled.append((*score(article['title'], article['summary']), relevant))
+    return labelled
+
+
+def precision_recall(labelled, reject_below, accept_above):
+    rejected = [rel for s, category, rel in labelled if s < reject_below and category == 'Other']
+    accepted = [rel for s, _, rel in labelled if s >= accept_above]
+    negatives = sum(1 for *_, rel in labelled if not rel)
+    positives = len(labelled) - negatives
+    return {
+        'reject_precision': rejected.count(False) / len(rejected) if rejected else 1.0,
+        'reject_recall': rejected.count(False) / negatives if negatives else 0.0,
+        'accept_precision': accepted.count(True) / len(accepted) if accepted else 1.0,
+        'accept_recall': accepted.count(True) / positives if positives else 0.0,
+        'llm_share': 1 - (len(rejected) + len(accepted)) / len(labelled),
+    }
+
+
+def evaluate(min_precision):
+    labelled = load_labelled()
+    if not labelled:
+        print("No Gemini-labelled articles to evaluate against.")
+        return
+    positives = sum(1 for *_, rel in labelled if rel)
+    print(f"Evaluating on {len(labelled)} labelled articles ({positives} relevant, {len(labelled) - positives} not)")
+
+    def report(label, reject_below, accept_above):
+        m = precision_recall(labelled, reject_below, accept_above)
+        print(f"{label:<10}{reject_below:>7.1f}{accept_above:>7.1f}"
+              f"{m['reject_precision']:>9.0%}{m['reject_recall']:>8.0%}"
+              f"{m['accept_precision']:>9.0%}{m['accept_recall']:>8.0%}{m['llm_share']:>8.0%}")
+
+    print(f"\n{'':<10}{'reject':>7}{'accept':>7}{'rej P':>9}{'rej R':>8}{'acc P':>9}{'acc R':>8}{'to LLM':>8}")
+    report('current', REJECT_BELOW, ACCEPT_ABOVE)
+
+    # Most permissive thresholds that keep each side's precision >= min_precision;
+    # rejection stays on negative evidence only
+    candidates = [x / 2 for x in range(-4, 41)]
+    best_reject = max((t for t in candidates if t <= 0
+                       if precision_recall(labelled, t, float('inf'))['reject_precision'] >= min_precision),
+                      default=REJECT_BELOW)
+    best_accept = min((t for t in candidates if t > best_reject
+                       and precision_recall(labelled, float('-inf'), t)['accept_precision'] >= min_precision),
+                      default=ACCEPT_ABOVE)
+    report('suggested', best_reject, best_accept)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local relevance pre-filter")
+    parser.add_argument("--evaluate", action="store_true",
+                        help="Report precision/recall of the thresholds against past Gemini labels")
+    parser.add_argument("--min-precision", type=float, default=0.95,
+                        help="Precision floor used when suggesting thresholds")
+    parser.add_argument("text", nargs="*", help="Score a title (for quick checks)")
+    args = parser.parse_args()
+
+    if args.evaluate:
+        evaluate(args.min_precision)
+    elif args.text:
+        s, category = score(' '.join(args.text))
+        print(f"{s:.2f} {category}")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,9 @@ from google import genai
 from google.genai import types
 from dotenv import load_dotenv
 import database  # Import DB module
+import llm_executor
+import gemini_client
+import http_client
 
 # Fix Windows console encoding
 if sys.platform == 'win32':
@@ -19,17 +22,30 @@ load_dotenv()
 API_KEY = os.getenv("GOOGLE_API_KEY")
 client = genai.Client(api_key=API_KEY)
 
+MODEL_ID = "gemini-3-pro-preview"
 FEED_DIR = os.path.join(os.getcwd(), 'web', 'public', 'feed')
+CRITIQUE_COLUMNS = ['title', 'facts_json', 'image_path']
 # FACTS_DIR deprecated
 
+def load_image(image_path):
+    """Image bytes from a local file or, once uploaded, its Cloudinary URL."""
+    if image_path.startswith(('http://', 'https://')):
+        response = http_client.get(image_path)
+        response.raise_for_status()
+        return response.content
+    with open(image_path, "rb") as f:
+        return f.read()
+
+def valid_critique(critique):
+    """Whether a critique answer carries a numeric score."""
+    score = critique.get('score') if isinstance(critique, dict) else None
+    return isinstance(score, (int, float)) and not isinstance(score, bool)
+
 def critique_image(image_path, fact_data):
     """
     Uses Gemini Vision to critique the generated image.
     """
     print(f"Critiquing: {os.path.basename(image_path)}...")
-    
-    with open(image_path, "rb") as f:
-        image_bytes = f.read()
 
     prompt = f"""
     You are an expert design and fact-checking agent for "LLM Lens".
@@ -55,67 +71,77 @@ def critique_image(image_path, fact_data):
     """
 
     try:
-        response = client.models.generate_content(
-            model="gemini-3-pro-preview",
+        image_bytes = load_image(image_path)
+        response = gemini_client.generate_content(
+            client,
+            model=MODEL_ID,
             contents=[prompt, types.Part.from_bytes(data=image_bytes, mime_type="image/png")],
             config=types.GenerateContentConfig(
                 response_mime_type="application/json"
-            )
+            ),
+            accept=gemini_client.json_where(valid_critique)
         )
-        return json.loads(response.text)
+        critique = json.loads(response.text)
+        if not valid_critique(critique):
+            raise ValueError(f"Malformed critique: {response.text[:200]}")
+        return critique
     except Exception as e:
         print(f"Error critiquing {image_path}: {e}")
-        return None
+        raise
 
 def main():
     database.init_db()
     
-    # Logic: Get articles that are visualized but NOT yet critiqued
-    # Since our simple get_articles_by_status doesn't filter by "not critiqued",
-    # we'll fetch 'visualized' and check the critique_json field in Python.
-    articles = database.get_articles_by_status('visualized', limit=50)
-    
-    print(f"Checking {len(articles)} articles for critique needs...")
+    # Articles move from 'uploaded' to 'critiqued', so the claim only sees uncritiqued ones
     updated_count = 0
 
-    for article in articles:
-        # Skip if already critiqued (check dict key)
-        if article.get('critique_json'):
-            continue
-            
-        print(f"Processing: {article.get('title', 'Unknown')[:50]}...")
+    with database.claimed_articles('uploaded', limit=50, columns=CRITIQUE_COLUMNS) as articles, database.StatusBuffer() as updates:
+        print(f"Checking {len(articles)} articles for critique needs...")
         
-        # We need the facts to critique against
-        if isinstance(article.get('facts_json'), str):
-            facts_data = json.loads(article['facts_json'])
-        else:
-            facts_data = article.get('facts_json')
+        jobs = []
+        for article in articles:
+            print(f"Processing: {article.get('title', 'Unknown')[:50]}...")
+        
+            # We need the facts to critique against
+            facts_data = article.facts
             
-        # We need the image path (local relative path stored in DB is /feed/xyz.png)
-        # We need to resolve this to absolute system path for opening
-        db_image_path = article.get('image_path')
-        if not db_image_path:
-            continue
+            # Uploaded rows hold the Cloudinary URL, or a /feed/xyz.png path (read
+            # from disk) when upload_visuals ran without Cloudinary. A missing
+            # image doesn't fix itself on a later run, so dead-letter at once.
+            db_image_path = article.get('image_path')
+            if not db_image_path:
+                updates.fail(article['id'], 'No image_path to critique', final=True)
+                continue
             
-        filename = os.path.basename(db_image_path)
-        local_image_path = os.path.join(FEED_DIR, filename)
-        
-        if not os.path.exists(local_image_path):
-            print(f"  Warning: Image not found at {local_image_path}")
-            continue
+            image_path = db_image_path
+            if db_image_path.startswith('/feed/'):
+                image_path = os.path.join(FEED_DIR, os.path.basename(db_image_path))
+                if not os.path.exists(image_path):
+                    print(f"  Warning: Image not found at {image_path}")
+                    updates.fail(article['id'], f"Image not found: {image_path}", final=True)
+                    continue
+            jobs.append((article, image_path, {'facts': facts_data}))
 
-        result = critique_image(local_image_path, {'facts': facts_data})
-        if result:
-            # Update DB with critique
-            database.update_article_status(
-                article['id'],
-                'visualized', # Status remains visualized, or we could add 'critiqued'
-                additional_data={'critique': result}
-            )
-            updated_count += 1
-            print(f"  -> Score: {result.get('score')} (Regen: {result.get('regeneration_required')})")
+        # Critiques run concurrently; results are written here as they finish
+        for (article, _, _), result, error in llm_executor.run(lambda job: critique_image(*job[1:]), jobs):
+            if result:
+                # Update DB with critique
+                updates.add(
+                    article['id'],
+                    'critiqued',
+                    additional_data={'critique': result}
+                )
+                updated_count += 1
+                print(f"  -> {article.get('title', 'Unknown')[:40]}... Score: {result.get('score')} "
+                      f"(Regen: {result.get('regeneration_required')})")
+            else:
+                print(f"  ✗ Critique failed: {article.get('title', 'Unknown')[:40]}... ({error})")
+                if gemini_client.counts_as_attempt(error):
+                    updates.fail(article['id'], error or 'No critique returned')
 
     print(f"Self-critique complete. Updated {updated_count} records.")
+    gemini_client.print_metrics()
 
 if __name__ == "__main__":
-    main()
+    with database.session():
+        main()
@@ -8,7 +8,6 @@ Values Technical Originality (e.g., ArXiv research) over external popularity.
 import os
 import sys
 import json
-import time
 from pathlib import Path
 from google import genai
 from google.genai import types
@@ -16,10 +15,17 @@ from dotenv import load_dotenv
 
 sys.path.append(str(Path(__file__).parent))
 import database
+import llm_executor
+import gemini_client
 
 load_dotenv()
 client = genai.Client(api_key=os.getenv('GOOGLE_API_KEY'))
 MODEL_ID = "gemini-3-pro-preview"
+VERIFY_COLUMNS = ['title', 'summary', 'source', 'facts_json', 'analysis_json']
+
+def valid_report(report):
+    """Whether a verification answer is a report with its verdict."""
+    return isinstance(report, dict) and isinstance(report.get('verified'), bool)
 
 def verify_facts(article):
     """
@@ -27,9 +33,7 @@ def verify_facts(article):
     Detects hallucinations or misinterpretations.
     Upholds technical originality as a primary value.
     """
-    facts = article.get('facts_json')
-    if isinstance(facts, str):
-        facts = json.loads(facts)
+    facts = article.facts
     
     summary = article.get('summary', '')
     title = article.get('title', '')
@@ -70,58 +74,56 @@ def verify_facts(article):
     """
 
     try:
-        response = client.models.generate_content(
+        response = gemini_client.generate_content(
+            client,
             model=MODEL_ID,
             contents=[prompt],
             config=types.GenerateContentConfig(
                 response_mime_type="application/json"
-            )
+            ),
+            accept=gemini_client.json_where(valid_report)
         )
         report = json.loads(response.text)
+        if not valid_report(report):
+            raise ValueError(f"Malformed verification report: {response.text[:200]}")
         return report
     except Exception as e:
         print(f"  Error verifying facts: {e}")
-        return None
+        raise
 
 def main():
     database.init_db()
-    # Get articles that are distilled but not yet verified
-    articles = database.get_articles_by_status('distilled', limit=15)
-    
-    print(f"Found {len(articles)} articles awaiting fidelity audit")
-    
+    # Distilled articles move to 'verified' once audited, so the claim only sees unaudited ones
     verified_count = 0
-    for article in articles:
-        # Check if already verified
-        if article.get('analysis_json') and 'verification' in article['analysis_json']:
-            continue
-            
-        print(f"Auditing Fidelity: {article['title'][:50]}...")
-        report = verify_facts(article)
+    with database.claimed_articles('distilled', limit=15, columns=VERIFY_COLUMNS) as articles, database.StatusBuffer() as updates:
+        print(f"Found {len(articles)} articles awaiting fidelity audit")
+        
+        # Audits run concurrently; results are written here as they finish
+        for article, report, error in llm_executor.run(verify_facts, articles):
+            print(f"Audited Fidelity: {article['title'][:50]}...")
         
-        if report:
-            # Update the analysis_json with verification results
-            current_analysis = article.get('analysis_json')
-            if isinstance(current_analysis, str):
-                current_analysis = json.loads(current_analysis)
-            elif not current_analysis:
-                current_analysis = {}
+            if report:
+                # Update the analysis_json with verification results
+                current_analysis = article.analysis or {}
             
-            current_analysis['verification'] = report
+                current_analysis['verification'] = report
             
-            # Update DB
-            update_data = {'analysis': current_analysis}
-            if report.get('corrected_facts'):
-                update_data['facts'] = report['corrected_facts']
-                print(f"  ! Technical refinement applied [Originality: {report.get('technical_originality')}]")
+                # Update DB
+                update_data = {'analysis': current_analysis}
+                if report.get('corrected_facts'):
+                    update_data['facts'] = report['corrected_facts']
+                    print(f"  ! Technical refinement applied [Originality: {report.get('technical_originality')}]")
             
-            database.update_article_status(article['id'], 'distilled', update_data)
-            verified_count += 1
-            print(f"  ✓ Audit Passed: Score {report.get('confidence_score')}%")
-        
-        time.sleep(1)
+                updates.add(article['id'], 'verified', update_data)
+                verified_count += 1
+                print(f"  ✓ Audit Passed: Score {report.get('confidence_score')}%")
+            else:
+                if gemini_client.counts_as_attempt(error):
+                    updates.fail(article['id'], error or 'No verification report returned')
 
     print(f"\nFidelity Audit complete. {verified_count} articles verified.")
+    gemini_client.print_metrics()
 
 if __name__ == "__main__":
-    main()
+    with database.session():
+        main()
@@ -29,9 +29,14 @@ export default function DatabaseInspector() {
 
     const getStatusIcon = (status: string) => {
         switch (status) {
+            case 'uploaded':
+            case 'critiqued':
             case 'visualized': return <ImageIcon className="w-4 h-4 text-green-400" />;
+            case 'verified':
             case 'distilled': return <CheckCircle2 className="w-4 h-4 text-blue-400" />;
             case 'ingested': return <RefreshCw className="w-4 h-4 text-yellow-400" />;
+            case 'duplicate':
+            case 'capped':
             case 'filtered': return <Filter className="w-4 h-4 text-gray-500" />;
             default: return <AlertCircle className="w-4 h-4 text-red-400" />;
         }
@@ -73,7 +78,7 @@ export default function DatabaseInspector() {
 
                 {/* Status Filter Cards */}
                 <div className="grid grid-cols-2 md:grid-cols-4 gap-4 mb-8">
-                    {['ingested', 'filtered', 'distilled', 'visualized'].map(status => (
+                    {['ingested', 'filtered', 'distilled', 'verified', 'visualized', 'uploaded', 'critiqued', 'duplicate', 'capped', 'failed'].map(status => (
                         <div key={status} className="bg-white/5 border border-white/10 p-4 rounded-3xl flex items-center justify-between">
                             <div className="flex items-center gap-3">
                                 {getStatusIcon(status)}
@@ -1,15 +1,33 @@
 import { NextResponse } from 'next/server';
 import { getDb } from '@/lib/db';
 
+// Opaque keyset cursor: base64url JSON [published_ts, id], same format as
+// encode_feed_cursor in execution/database.py
+function encodeCursor(publishedTs: number, id: string): string {
+    return Buffer.from(JSON.stringify([publishedTs, id])).toString('base64url');
+}
+
+function decodeCursor(cursor: string): [number, string] | null {
+    try {
+        const [publishedTs, id] = JSON.parse(Buffer.from(cursor, 'base64url').toString());
+        return [Number(publishedTs), String(id)];
+    } catch {
+        return null;
+    }
+}
+
 export async function GET(request: Request) {
     try {
         const { searchParams } = new URL(request.url);
         const offset = parseInt(searchParams.get('offset') || '0');
         const limit = parseInt(searchParams.get('limit') || '30');
         const source = searchParams.get('source');
+        const cursor = searchParams.get('cursor');
 
         const db = getDb();
-        let querySql = "SELECT * FROM articles WHERE status IN ('visualized', 'distilled')";
+        // Keep in sync with FEED_STATUSES in execution/database.py; the literal list
+        // must match idx_feed_published's WHERE clause for SQLite to use that index
+        let querySql = "SELECT * FROM articles WHERE status IN ('distilled', 'verified', 'visualized', 'critiqued', 'uploaded')";
         const params: any[] = [];
 
         if (source && source !== 'All') {
@@ -17,8 +35,24 @@ export async function GET(request: Request) {
             params.push(source);
         }
 
-        querySql += " ORDER BY published DESC LIMIT ? OFFSET ?";
-        params.push(limit, offset);
+        if (cursor) {
+            // Keyset seek: cost is independent of how deep the page is
+            const position = decodeCursor(cursor);
+            if (!position) {
+                return NextResponse.json({ error: 'Invalid cursor' }, { status: 400 });
+            }
+            querySql += " AND (published_ts, id) < (?, ?)";
+            params.push(...position);
+        }
+
+        // published_ts is the normalized UTC epoch; this order is served by idx_feed_published
+        querySql += " ORDER BY published_ts DESC, id DESC LIMIT ?";
+        params.push(limit);
+        if (!cursor && offset > 0) {
+            // Legacy offset paging, kept for old clients
+            querySql += " OFFSET ?";
+            params.push(offset);
+        }
 
         const result = await db.execute({
             sql: querySql,
@@ -45,7 +79,14 @@ export async function GET(request: Request) {
             };
         });
 
-        return NextResponse.json(feed);
+        // Next page cursor travels in a header so the body stays a plain array
+        const headers: Record<string, string> = {};
+        const last: any = result.rows[result.rows.length - 1];
+        if (result.rows.length === limit && last) {
+            headers['X-Next-Cursor'] = encodeCursor(Number(last.published_ts), String(last.id));
+        }
+
+        return NextResponse.json(feed, { headers });
     } catch (error) {
         console.error("Database Error:", error);
         return NextResponse.json({ error: 'Database Feed Error' }, { status: 500 });
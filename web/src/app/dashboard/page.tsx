@@ -26,6 +26,7 @@ export default function DashboardPage() {
     const [loading, setLoading] = useState(true);
     const [loadingMore, setLoadingMore] = useState(false);
     const [hasMore, setHasMore] = useState(true);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
     const [selectedSource, setSelectedSource] = useState("All");
 
     const ITEMS_PER_PAGE = 30;
@@ -44,17 +45,16 @@ export default function DashboardPage() {
         "r/artificial",
     ];
 
-    const fetchFeed = async (offset: number = 0, append: boolean = false, source: string = selectedSource) => {
+    const fetchFeed = async (cursor: string | null = null, append: boolean = false, source: string = selectedSource) => {
         try {
-            const res = await fetch(`/api/feed?offset=${offset}&limit=${ITEMS_PER_PAGE}&source=${encodeURIComponent(source)}`);
+            const cursorParam = cursor ? `&cursor=${encodeURIComponent(cursor)}` : '';
+            const res = await fetch(`/api/feed?limit=${ITEMS_PER_PAGE}&source=${encodeURIComponent(source)}${cursorParam}`);
             if (res.ok) {
                 const data = await res.json();
+                const next = res.headers.get('X-Next-Cursor');
 
-                if (data.length < ITEMS_PER_PAGE) {
-                    setHasMore(false);
-                } else {
-                    setHasMore(true);
-                }
+                setNextCursor(next);
+                setHasMore(Boolean(next));
 
                 if (append) {
                     setItems(prev => [...prev, ...data]);
@@ -72,14 +72,14 @@ export default function DashboardPage() {
 
     useEffect(() => {
         setLoading(true);
-        fetchFeed(0, false, selectedSource);
-        const interval = setInterval(() => fetchFeed(0, false, selectedSource), 60000); // Refresh every minute
+        fetchFeed(null, false, selectedSource);
+        const interval = setInterval(() => fetchFeed(null, false, selectedSource), 60000); // Refresh every minute
         return () => clearInterval(interval);
     }, [selectedSource]);
 
     const loadMore = () => {
         setLoadingMore(true);
-        fetchFeed(items.length, true, selectedSource);
+        fetchFeed(nextCursor, true, selectedSource);
     };
 
     return (